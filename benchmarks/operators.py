@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+if __package__ in (None, ''):
+    # Запуск файлом (python benchmarks/operators.py): пакет tools ищется в
+    # корне репозитория, как при запуске python -m benchmarks.operators.
+    sys.path.insert(
+        0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.crossover import crossover
+from tools.fitness import (fitness_batch, fitness_count, fitness_recurrent,
+                           fitness_streamed)
+from tools.main_algorithm import genetic_algorithm
+from tools.mutation import mutation
+from tools.population_creator import (create_individual, create_population,
+                                      is_chromosome_valid)
+
+SIZES = (8, 25, 100, 300, 1000)
+
+
+def random_matrix(n: int) -> np.ndarray:
+    """
+
+    :param n: количество особей
+    :return: случайная симметричная таблица мер близости с единицами на
+    диагонали
+    """
+    values: np.ndarray = np.random.uniform(0.5, 1.0, size=(n, n))
+    matrix: np.ndarray = np.triu(values, 1)
+    return matrix + matrix.T + np.eye(n)
+
+
+def measure(function, repeat: int, min_time: float = 0.0) -> dict:
+    """
+
+    :param function: функция без аргументов
+    :param repeat: количество замеров
+    :param min_time: наименьшее общее время замеров в секундах
+    :return: медиана и минимум времени одного вызова в секундах
+
+    Количество вызовов в одном замере удваивается (как в timeit.autorange),
+    пока repeat замеров не займут хотя бы min_time: замеры быстрых функций
+    длиной в доли миллисекунды слишком зависят от шума. Подбор количества
+    вызовов служит и разогревом.
+    """
+    number: int = 1
+    while True:
+        start: float = time.perf_counter()
+        for _ in range(number):
+            function()
+        if (time.perf_counter() - start) * repeat >= min_time:
+            break
+        number *= 2
+    timings: list = []
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {'seconds': statistics.median(timings), 'min': min(timings),
+            'calls': repeat * number}
+
+
+def failure_rate(operator, trials: int) -> float:
+    """
+
+    :param operator: функция, возвращающая список результатов операции
+    :param trials: количество запусков
+    :return: доля результатов None (ImpossibleToCompleteError)
+
+    Родители выбираются из популяции случайно при каждом запуске.
+    """
+    results: list = []
+    for _ in range(trials):
+        results.extend(operator())
+    return sum(result is None for result in results) / len(results)
+
+
+def benchmark_size(n: int, args: argparse.Namespace) -> list:
+    """
+
+    :param n: количество особей в таблице
+    :param args: параметры запуска
+    :return: результаты замеров для таблицы размера n
+    """
+    standard: np.ndarray = random_matrix(n)
+    population = create_population(n, args.population_size)
+    first, second = population.genes[0], population.genes[1]
+    center: int = n // 2
+    repeat: int = args.repeat
+    cases: dict = {
+        'create_individual': lambda: create_individual(n),
+        'is_chromosome_valid': lambda: is_chromosome_valid(first),
+        'crossover': lambda: crossover(first, second, center),
+        'mutation': lambda: mutation(first),
+        'fitness_recurrent': lambda: fitness_recurrent(first, standard),
+        # Время вычисления приспособленности всей популяции.
+        'fitness_batch': lambda: fitness_batch(population.genes,
+                                               standard=standard),
+        'fitness_streamed': lambda: fitness_streamed(population.genes,
+                                                     standard=standard),
+    }
+    if n <= args.max_reference_size:
+        cases['fitness_count'] = lambda: fitness_count(first, standard)
+    results: list = [
+        {'benchmark': name, 'n': n,
+         **measure(function, repeat, args.min_time)}
+        for name, function in cases.items()
+    ]
+
+    def generations() -> None:
+        # Одинаковый seed в каждом вызове: иначе замеры отличаются
+        # не только шумом, но и выполненной работой.
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        genetic_algorithm(n, args.population_size, args.generations,
+                          standard=standard)
+
+    results.append({
+        'benchmark': 'generations', 'n': n,
+        'generations': args.generations,
+        'population_size': args.population_size,
+        **measure(generations, repeat, args.min_time),
+    })
+
+    def pick() -> np.ndarray:
+        return population.genes[random.randrange(len(population))]
+
+    for name, operator in (
+            ('crossover', lambda: crossover(pick(), pick(), center)),
+            ('mutation', lambda: [mutation(pick())])):
+        results.append({
+            'benchmark': f'{name}_failure_rate', 'n': n,
+            'rate': failure_rate(operator, args.trials),
+            'trials': args.trials,
+        })
+    return results
+
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """
+
+    :param results: текущие результаты
+    :param baseline_path: путь к файлу с результатами предыдущего запуска
+    :param threshold: допустимое отношение времени к предыдущему запуску
+    :return: список замедлившихся замеров
+
+    Сравнивается минимальное время замера: шум (другие процессы, частота
+    процессора) только увеличивает время, поэтому минимум устойчивее
+    медианы.
+    """
+    with open(baseline_path) as file:
+        baseline: dict = {
+            (result['benchmark'], result['n']): result
+            for result in json.load(file)['results']
+        }
+    regressions: list = []
+    for result in results:
+        previous = baseline.get((result['benchmark'], result['n']))
+        if previous is None or 'min' not in result:
+            continue
+        ratio: float = result['min'] / previous['min']
+        if ratio > threshold:
+            regressions.append({
+                'benchmark': result['benchmark'], 'n': result['n'],
+                'min': result['min'],
+                'baseline': previous['min'], 'ratio': ratio,
+            })
+    return regressions
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Замеры скорости операторов генетического алгоритма')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--population-size', type=int, default=20)
+    parser.add_argument('--generations', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='наименьшее общее время замеров одного случая')
+    parser.add_argument('--trials', type=int, default=50,
+                        help='запусков для оценки доли неудачных операций')
+    parser.add_argument('--max-reference-size', type=int, default=300,
+                        help='наибольший размер для медленной fitness_count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='-',
+                        help='файл для результатов (по умолчанию stdout)')
+    parser.add_argument('--compare',
+                        help='файл с результатами предыдущего запуска')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='допустимое замедление при сравнении')
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    args = parse_args(argv)
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    results: list = []
+    for n in args.sizes:
+        results.extend(benchmark_size(n, args))
+    report: dict = {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'arguments': {key: value for key, value in vars(args).items()
+                          if key not in ('output', 'compare')},
+        },
+        'results': results,
+    }
+    if args.compare:
+        report['regressions'] = compare(results, args.compare, args.threshold)
+    text: str = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(text)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
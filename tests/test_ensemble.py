@@ -0,0 +1,56 @@
+import numpy as np
+
+from tools.ensemble import clade_frequencies, consensus_tree
+from tools.newick import to_newick
+
+
+def leaf_sets(node, clades: list) -> set:
+    """Собирает множества простейших вершин внутренних вершин дерева."""
+    if node.leaf is not None:
+        return {node.leaf}
+    leaves: set = set()
+    for child in node.children:
+        child_leaves: set = leaf_sets(child, clades)
+        assert not leaves & child_leaves
+        leaves |= child_leaves
+    clades.append(leaves)
+    return leaves
+
+
+# Деревья ((0, 1), 2), 3, ((1, 2), 0), 3 и ((0, 2), 1), 3: клады {0, 1},
+# {1, 2} и {0, 2} встречаются в трети деревьев и попарно несовместимы.
+CONFLICTING = [
+    np.array([[0, 1], [0, 2], [0, 3]]),
+    np.array([[1, 2], [0, 1], [0, 3]]),
+    np.array([[0, 2], [0, 1], [0, 3]]),
+]
+
+
+def test_majority_rule_skips_minority_clades():
+    root = consensus_tree(clade_frequencies(CONFLICTING), 4)
+    clades: list = []
+    assert leaf_sets(root, clades) == {0, 1, 2, 3}
+    assert sorted(map(sorted, clades)) == [[0, 1, 2], [0, 1, 2, 3]]
+
+
+def test_low_threshold_keeps_tree_valid():
+    root = consensus_tree(clade_frequencies(CONFLICTING), 4, threshold=0.2)
+    clades: list = []
+    assert leaf_sets(root, clades) == {0, 1, 2, 3}
+    for first in clades:
+        for second in clades:
+            assert first <= second or second <= first or not first & second
+    # Из равных по частоте несовместимых клад выбирается одна.
+    assert sorted(map(sorted, clades)) == [[0, 1], [0, 1, 2], [0, 1, 2, 3]]
+    newick: str = to_newick(root, ['a', 'b', 'c', 'd'])
+    assert newick.count('(') == newick.count(')') == len(clades)
+    for name in 'abcd':
+        assert newick.count(name) == 1
+
+
+def test_low_threshold_prefers_frequent_clades():
+    chromosomes: list = [CONFLICTING[1]] * 2 + [CONFLICTING[0]]
+    root = consensus_tree(clade_frequencies(chromosomes), 4, threshold=0.0)
+    clades: list = []
+    leaf_sets(root, clades)
+    assert {1, 2} in clades and {0, 1} not in clades
@@ -0,0 +1,234 @@
+import sys
+from functools import partial
+
+import numpy as np
+from numpy import random
+
+from tools.fitness import fitness_batch, fitness_count, get_standard
+from tools.population_creator import (EMPTY, create_population,
+                                      is_chromosome_valid)
+
+try:
+    import numba
+except ImportError:  # numba не обязателен, без него работает reference
+    numba = None
+
+prange = range if numba is None else numba.prange
+
+
+def _fitness_kernel(chromosomes: np.ndarray, standard: np.ndarray,
+                    result: np.ndarray) -> None:
+    """
+
+    :param chromosomes: массив хромосом int64 формы (особи, n - 1, 2)
+    :param standard: эталонная таблица float64
+    :param result: массив для значений функции приспособленности
+
+    Для каждой вершины хранится связный список её простейших вершин
+    (heads, tails, following). Для каждого гена перебираются все пары
+    простейших вершин между его вершинами: сначала вычисляется среднее
+    значение, затем сумма квадратов отклонений от него, как в
+    fitness_count. Каждая пара простейших вершин перебирается ровно в
+    одном гене, поэтому на особь уходит O(n^2) операций и O(n) памяти.
+    """
+    size: int = chromosomes.shape[0]
+    n: int = chromosomes.shape[1] + 1
+    for p in prange(size):
+        following = np.full(n, -1, dtype=np.int64)
+        heads = np.arange(n)
+        tails = np.arange(n)
+        sizes = np.ones(n, dtype=np.int64)
+        total = 0.0
+        for k in range(n - 1):
+            node_1 = chromosomes[p, k, 0]
+            node_2 = chromosomes[p, k, 1]
+            dividend = 0.0
+            i = heads[node_1]
+            while i != -1:
+                j = heads[node_2]
+                while j != -1:
+                    dividend += standard[i, j]
+                    j = following[j]
+                i = following[i]
+            average = dividend / (sizes[node_1] * sizes[node_2])
+            i = heads[node_1]
+            while i != -1:
+                j = heads[node_2]
+                while j != -1:
+                    total += (average - standard[i, j]) ** 2
+                    j = following[j]
+                i = following[i]
+            following[tails[node_1]] = heads[node_2]
+            tails[node_1] = tails[node_2]
+            sizes[node_1] += sizes[node_2]
+        result[p] = 2 * total
+
+
+def _is_valid_kernel(chromosome: np.ndarray) -> bool:
+    """
+
+    :param chromosome: хромосома int64 (или её шаблон)
+    :return: True/False для верной/нарушенной топологии хромосомы
+
+    Тот же алгоритм, что в is_chromosome_valid, в виде цикла.
+    """
+    genes_amount: int = chromosome.shape[0]
+    last = np.full(genes_amount + 1, -1, dtype=np.int64)
+    for k in range(genes_amount):
+        if chromosome[k, 1] != EMPTY:
+            last[chromosome[k, 0]] = k
+            last[chromosome[k, 1]] = k
+    for k in range(genes_amount):
+        if chromosome[k, 1] != EMPTY and last[chromosome[k, 1]] > k:
+            return False
+    return True
+
+
+if numba is not None:
+    _fitness_kernel = numba.njit(parallel=True, cache=True)(_fitness_kernel)
+    _is_valid_kernel = numba.njit(cache=True)(_is_valid_kernel)
+
+
+# Исходные функции ядер на Python (у скомпилированной функции numba -
+# атрибут py_func).
+_fitness_python = getattr(_fitness_kernel, 'py_func', _fitness_kernel)
+_is_valid_python = getattr(_is_valid_kernel, 'py_func', _is_valid_kernel)
+
+
+def fitness_compiled(population: list, standard: np.ndarray = None,
+                     kernel=None) -> np.ndarray:
+    """
+
+    :param population: популяция (список особей или массив хромосом)
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param kernel: ядро (по умолчанию _fitness_kernel)
+    :return: массив значений функции приспособленности всех особей
+
+    Функция приспособленности на ядре _fitness_kernel, которое при наличии
+    numba компилируется и обрабатывает особи параллельно.
+    """
+    if kernel is None:
+        kernel = _fitness_kernel
+    standard = np.ascontiguousarray(get_standard(standard), dtype=np.float64)
+    chromosomes: np.ndarray = np.ascontiguousarray(population, dtype=np.int64)
+    result: np.ndarray = np.empty(len(chromosomes))
+    if len(chromosomes):
+        kernel(chromosomes, standard, result)
+    return result
+
+
+def is_valid_compiled(chromosome: np.ndarray, kernel=None) -> bool:
+    if kernel is None:
+        kernel = _is_valid_kernel
+    return bool(kernel(np.ascontiguousarray(chromosome, dtype=np.int64)))
+
+
+class Backend:
+    """
+    Набор реализаций функции приспособленности популяции (fitness) и
+    проверки топологии хромосомы (is_valid).
+
+    genetic_algorithm использует fitness при evaluation='auto', а is_valid -
+    для проверки хромосом контрольной точки, с которой продолжается работа.
+    """
+
+    def __init__(self, name: str, fitness, is_valid):
+        self.name = name
+        self.fitness = fitness
+        self.is_valid = is_valid
+
+
+# reference - исходные функции на numpy, numba - компилированные ядра
+# (доступен, только если установлен numba).
+BACKENDS = {
+    'reference': Backend('reference', fitness_batch, is_chromosome_valid),
+}
+if numba is not None:
+    BACKENDS['numba'] = Backend('numba', fitness_compiled, is_valid_compiled)
+
+# Ядра без компиляции: self_check проверяет на них алгоритм ядер и тогда,
+# когда numba не установлен. Для работы алгоритма они слишком медленные.
+KERNELS = Backend('kernels',
+                  partial(fitness_compiled, kernel=_fitness_python),
+                  partial(is_valid_compiled, kernel=_is_valid_python))
+
+
+def get_backend(name: str = None) -> Backend:
+    """
+
+    :param name: имя бэкенда (ключ BACKENDS) или None
+    :return: бэкенд с этим именем; по умолчанию numba, если он установлен,
+    иначе reference
+    """
+    if name is None:
+        name = 'numba' if 'numba' in BACKENDS else 'reference'
+    if name not in BACKENDS:
+        raise ValueError(
+            f'Неизвестный или недоступный бэкенд {name!r}, '
+            f'доступные: {", ".join(BACKENDS)}')
+    return BACKENDS[name]
+
+
+def self_check(backend: Backend, sizes: tuple = (2, 3, 8, 25, 60),
+               population_size: int = 20, seed: int = 0,
+               tolerance: float = 1e-9) -> list:
+    """
+
+    :param backend: проверяемый бэкенд
+    :param sizes: количества особей в случайных таблицах
+    :param population_size: количество хромосом на каждый размер
+    :param seed: значение для генератора случайных чисел
+    :param tolerance: допустимая относительная разница значений функции
+    приспособленности
+    :return: список найденных расхождений с исходными функциями (пустой,
+    если расхождений нет)
+
+    Функция приспособленности сравнивается с fitness_count на случайных
+    таблицах и популяциях, проверка топологии - с is_chromosome_valid на
+    верных хромосомах, шаблонах с незаполненными генами и хромосомах с
+    переставленными генами.
+    """
+    state = random.get_state()
+    random.seed(seed)
+    problems: list = []
+    try:
+        for n in sizes:
+            standard: np.ndarray = random.uniform(0.5, 1.0, (n, n))
+            standard = (standard + standard.T) / 2
+            np.fill_diagonal(standard, 1.0)
+            genes: np.ndarray = create_population(n, population_size).genes
+            expected: np.ndarray = np.array([
+                fitness_count(chromosome, standard) for chromosome in genes])
+            actual: np.ndarray = backend.fitness(genes, standard=standard)
+            if not np.allclose(actual, expected, rtol=tolerance,
+                               atol=tolerance):
+                problems.append(
+                    f'n={n}: fitness differs by '
+                    f'{np.abs(actual - expected).max():.3g}')
+            for chromosome in genes:
+                candidates: list = [chromosome, chromosome[::-1]]
+                template: np.ndarray = chromosome.copy()
+                template[random.random_sample(n - 1) < 0.5] = EMPTY
+                candidates.append(template)
+                if n > 2:
+                    candidates.append(np.roll(chromosome, 1, axis=0))
+                for candidate in candidates:
+                    if (backend.is_valid(candidate)
+                            != is_chromosome_valid(candidate)):
+                        problems.append(
+                            f'n={n}: is_valid differs for '
+                            f'{candidate.tolist()}')
+    finally:
+        random.set_state(state)
+    return problems
+
+
+if __name__ == '__main__':
+    failed: bool = False
+    for backend in (KERNELS, *BACKENDS.values()):
+        found: list = self_check(backend)
+        failed = failed or bool(found)
+        print(f'{backend.name}: {"OK" if not found else "FAILED"}')
+        for problem in found:
+            print(f'    {problem}')
+    sys.exit(1 if failed else 0)
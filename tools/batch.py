@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from tools.loader import LOADERS, load_matrix
+from tools.main_algorithm import genetic_algorithm
+from tools.operator_rates import OperatorRates
+from tools.stopping import StoppingCriteria
+
+# Расширения файлов-манифестов со списком задач.
+MANIFESTS = ('.txt', '.jsonl')
+
+# Ключи задачи, которые run_job обрабатывает сам.
+JOB_KEYS = ('path', 'matrix', 'seed', 'population_size', 'max_generations')
+
+# Критерии остановки (параметры StoppingCriteria).
+STOPPING_KEYS = ('stall_generations', 'epsilon', 'target_fitness',
+                 'time_limit', 'max_evaluations')
+
+# Параметры genetic_algorithm, которые передаются без изменений.
+PARAMETERS = ('selection', 'elitism', 'memetic', 'evaluation', 'init',
+              'unique', 'sharing', 'steady_state', 'workers')
+
+# Вероятности операторов: {ключ задачи: параметр OperatorRates}.
+RATE_KEYS = {
+    'crossover_rate': 'crossover',
+    'mutation_rate': 'mutation',
+    'adaptive_rates': 'adaptive',
+}
+
+
+def read_manifest(path: str) -> list:
+    """
+
+    :param path: путь к манифесту
+    :return: список задач
+
+    Каждая непустая строка манифеста - это либо путь к таблице, либо объект
+    JSON с ключом "path" и необязательными параметрами генетического
+    алгоритма (см. job_arguments). Относительные пути отсчитываются от
+    папки манифеста.
+    """
+    jobs: list = []
+    folder: str = os.path.dirname(path)
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            job: dict = json.loads(line) if line.startswith('{') else {
+                'path': line}
+            job['path'] = os.path.join(folder, job['path'])
+            jobs.append(job)
+    return jobs
+
+
+def collect_jobs(inputs: list) -> list:
+    """
+
+    :param inputs: папки с таблицами, манифесты или пути к таблицам
+    :return: список задач
+    """
+    jobs: list = []
+    for path in inputs:
+        if os.path.isdir(path):
+            jobs.extend(
+                {'path': os.path.join(path, name)}
+                for name in sorted(os.listdir(path))
+                if os.path.splitext(name)[1].lower() in LOADERS
+            )
+        elif os.path.splitext(path)[1].lower() in MANIFESTS:
+            jobs.extend(read_manifest(path))
+        else:
+            jobs.append({'path': path})
+    return jobs
+
+
+def job_arguments(job: dict) -> dict:
+    """
+
+    :param job: задача
+    :return: параметры genetic_algorithm задачи (кроме standard и
+    observers)
+
+    Кроме JOB_KEYS задача может содержать критерии остановки
+    (STOPPING_KEYS), параметры PARAMETERS и вероятности операторов
+    (RATE_KEYS). Значения None не учитываются. Неизвестные ключи и
+    max_generations меньше 1 - ошибка ValueError, а не молча
+    проигнорированный параметр.
+    """
+    unknown: set = (set(job) - set(JOB_KEYS) - set(STOPPING_KEYS)
+                    - set(PARAMETERS) - set(RATE_KEYS))
+    if unknown:
+        raise ValueError(
+            f'Неизвестные параметры задачи: {", ".join(sorted(unknown))}')
+    if job['max_generations'] < 1:
+        raise ValueError(
+            f'Количество поколений должно быть не меньше 1, '
+            f'а не {job["max_generations"]}')
+    arguments: dict = {
+        'population_size': job['population_size'],
+        'max_generations': job['max_generations'],
+        'stopping': StoppingCriteria(**{
+            name: job[name] for name in STOPPING_KEYS
+            if job.get(name) is not None}),
+    }
+    arguments.update(
+        (name, job[name]) for name in PARAMETERS
+        if job.get(name) is not None)
+    rates: dict = {parameter: job[name] for name, parameter in
+                   RATE_KEYS.items() if job.get(name) is not None}
+    if rates:
+        arguments['rates'] = OperatorRates(**rates)
+    return arguments
+
+
+def run_job(job: dict, observers: list = ()) -> dict:
+    """
+
+    :param job: задача - путь к таблице (или сама таблица в job['matrix'])
+    и параметры алгоритма (см. job_arguments)
+    :param observers: наблюдатели genetic_algorithm (см. tools.observer)
+    :return: результат задачи
+
+    Генераторы случайных чисел инициализируются значением job['seed'],
+    поэтому результат задачи не зависит от процесса, в котором она
+    выполняется. Любая ошибка задачи (в том числе в её параметрах)
+    возвращается в ключе error, а не прерывает пакет.
+    """
+    start: float = time.perf_counter()
+    try:
+        arguments: dict = job_arguments(job)
+        random.seed(job['seed'])
+        np.random.seed(job['seed'])
+        standard: np.ndarray = (np.array(job['matrix'], dtype=float)
+                                if 'matrix' in job
+                                else load_matrix(job['path']))
+        best, min_values, _, reason = genetic_algorithm(
+            speciman_size=len(standard), standard=standard,
+            observers=observers, **arguments)
+        return {
+            'path': job.get('path'),
+            'chromosome': best.tolist(),
+            'fitness': float(min_values[-1]),
+            'runtime': time.perf_counter() - start,
+            'generations': len(min_values),
+            'stop_reason': reason,
+            'seed': job['seed'],
+        }
+    except Exception as error:
+        return {
+            'path': job.get('path'),
+            'error': f'{type(error).__name__}: {error}',
+            'runtime': time.perf_counter() - start,
+        }
+
+
+def run_batch(jobs: list, processes: int, output) -> int:
+    """
+
+    :param jobs: список задач
+    :param processes: количество процессов
+    :param output: файл, в который построчно пишутся результаты
+    :return: количество задач, завершившихся ошибкой
+
+    Результаты выводятся по мере завершения задач, а не в порядке их
+    следования.
+    """
+    failed: int = 0
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures: list = [executor.submit(run_job, job) for job in jobs]
+        for future in as_completed(futures):
+            result: dict = future.result()
+            failed += 'error' in result
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+    return failed
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Пакетный запуск генетического алгоритма')
+    parser.add_argument(
+        'inputs', nargs='+',
+        help='папки с таблицами, манифесты (.txt, .jsonl) или таблицы')
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--population-size', type=int, default=100)
+    parser.add_argument('--max-generations', type=int, default=1000)
+    parser.add_argument('--stall-generations', type=int)
+    parser.add_argument('--epsilon', type=float, default=0.0)
+    parser.add_argument('--target-fitness', type=float)
+    parser.add_argument('--time-limit', type=float,
+                        help='ограничение времени одной задачи в секундах')
+    parser.add_argument('--max-evaluations', type=int)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed первой задачи, далее seed + номер задачи')
+    parser.add_argument('--output', default='-',
+                        help='файл для результатов (по умолчанию stdout)')
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    args = parse_args(argv)
+    jobs: list = collect_jobs(args.inputs)
+    for number, job in enumerate(jobs):
+        job.setdefault('population_size', args.population_size)
+        job.setdefault('max_generations', args.max_generations)
+        job.setdefault('seed', args.seed + number)
+        for name in STOPPING_KEYS:
+            job.setdefault(name, getattr(args, name))
+    if args.output == '-':
+        failed: int = run_batch(jobs, args.processes, sys.stdout)
+    else:
+        with open(args.output, 'w') as output:
+            failed = run_batch(jobs, args.processes, output)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from hashlib import blake2b
+
+import numpy as np
+
+
+def cluster_masks(chromosome: list) -> list:
+    """
+
+    :param chromosome: хромосома особи
+    :return: список битовых масок вершин, образованных генами хромосомы
+
+    Каждая вершина дерева представляется целым числом, в котором i-й бит
+    установлен, если простейшая вершина i входит в эту вершину. Набор масок
+    однозначно задаёт топологию дерева и не зависит ни от порядка вершин
+    внутри гена, ни от порядка независимых объединений.
+    """
+    masks: dict = {}
+    result: list = []
+    for node_1, node_2 in np.asarray(chromosome).tolist():
+        mask: int = (masks.pop(node_1, 1 << node_1)
+                     | masks.pop(node_2, 1 << node_2))
+        masks[min(node_1, node_2)] = mask
+        result.append(mask)
+    return result
+
+
+def canonical_key(chromosome: list) -> bytes:
+    """
+
+    :param chromosome: хромосома особи
+    :return: канонический ключ топологии дерева
+
+    Ключом служит хеш отсортированного набора масок cluster_masks, поэтому
+    хромосомы, задающие одно и то же дерево, получают один и тот же ключ.
+    """
+    masks: list = sorted(cluster_masks(chromosome))
+    size: int = (len(chromosome) + 8) // 8
+    digest = blake2b(digest_size=16)
+    for mask in masks:
+        digest.update(mask.to_bytes(size, 'little'))
+    return digest.digest()
+
+
+# Количество элементов эталонной таблицы, хешируемых matrix_digest за раз.
+DIGEST_ELEMENTS = 2 ** 22
+
+
+def matrix_digest(standard: np.ndarray) -> bytes:
+    """
+
+    :param standard: эталонная таблица, в том числе отображённая в память
+    :return: хеш формы, типа и значений таблицы (16 байт)
+
+    Таблица читается блоками строк, поэтому отображённая в память таблица
+    не загружается целиком.
+    """
+    digest = blake2b(digest_size=16)
+    digest.update(f'{standard.shape} {standard.dtype.str}'.encode())
+    rows: int = max(1, DIGEST_ELEMENTS // max(1, standard.shape[-1]))
+    for start in range(0, len(standard), rows):
+        digest.update(np.ascontiguousarray(standard[start:start + rows]))
+    return digest.digest()
+
+
+class FitnessCache:
+    """
+    Кэш значений функции приспособленности с вытеснением давно не
+    использованных записей (LRU).
+
+    Ключом служит canonical_key хромосомы. Счётчики hits и misses позволяют
+    оценить, сколько вычислений удалось избежать.
+
+    Ключ описывает только топологию дерева, поэтому кэш привязывается к
+    эталонной таблице (bind): digest - хеш таблицы (matrix_digest), для
+    которой вычислены значения.
+    """
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.digest = None
+        self._values = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def get(self, key: bytes):
+        """
+
+        :param key: канонический ключ хромосомы
+        :return: сохранённое значение или None
+        """
+        value = self._values.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._values.move_to_end(key)
+        return value
+
+    def put(self, key: bytes, value: float) -> None:
+        """
+
+        :param key: канонический ключ хромосомы
+        :param value: значение функции приспособленности
+        """
+        self._values[key] = value
+        self._values.move_to_end(key)
+        while len(self._values) > self.maxsize:
+            self._values.popitem(last=False)
+
+    def bind(self, standard: np.ndarray) -> None:
+        """
+
+        :param standard: эталонная таблица, для которой используется кэш
+
+        Если кэш уже привязан к другой таблице, его записи удаляются: они
+        вычислены для других данных.
+        """
+        digest: bytes = matrix_digest(standard)
+        if self.digest is not None and self.digest != digest:
+            self._values.clear()
+        self.digest = digest
+
+    def to_arrays(self) -> tuple:
+        """
+
+        :return: ключи (массив uint8 формы (записи, 16)) и значения кэша
+        в порядке от давно использованных к недавно использованным
+        """
+        keys: np.ndarray = np.frombuffer(
+            b''.join(self._values), dtype=np.uint8).reshape(-1, 16)
+        values: np.ndarray = np.fromiter(
+            self._values.values(), dtype=np.float64, count=len(self._values))
+        return keys, values
+
+    def load_arrays(self, keys: np.ndarray, values: np.ndarray,
+                    digest: bytes = None) -> None:
+        """
+
+        :param keys: ключи, полученные методом to_arrays
+        :param values: значения, полученные методом to_arrays
+        :param digest: хеш таблицы, для которой вычислены значения (None -
+        не проверяется)
+
+        Добавляет записи в кэш с сохранением их порядка вытеснения.
+        """
+        if (digest is not None and self.digest is not None
+                and digest != self.digest):
+            raise ValueError(
+                'Значения кэша вычислены для другой эталонной таблицы')
+        for key, value in zip(keys, values.tolist()):
+            self.put(key.tobytes(), value)
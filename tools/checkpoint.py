@@ -0,0 +1,109 @@
+import os
+import random
+import time
+
+import numpy as np
+
+
+class Checkpointer:
+    """
+    Периодическое сохранение состояния генетического алгоритма.
+
+    Контрольная точка записывается после поколения, если с момента
+    предыдущей записи прошло не меньше every_generations поколений или
+    every_seconds секунд (критерий, равный None, не используется). Если
+    оба критерия равны None, контрольная точка записывается после каждого
+    поколения. При продолжении работы genetic_algorithm отсчитывает
+    поколения от номера поколения контрольной точки resume.
+    """
+
+    def __init__(self, path: str, every_generations: int = None,
+                 every_seconds: float = None):
+        self.path = path
+        self.every_generations = every_generations
+        self.every_seconds = every_seconds
+        self.saved_generation = 0
+        self.saved_time = time.monotonic()
+
+    def due(self, generation: int) -> bool:
+        """
+
+        :param generation: номер завершённого поколения
+        :return: нужно ли записать контрольную точку
+        """
+        if self.every_generations is None and self.every_seconds is None:
+            return True
+        if (self.every_generations is not None and generation
+                - self.saved_generation >= self.every_generations):
+            return True
+        return (self.every_seconds is not None and time.monotonic()
+                - self.saved_time >= self.every_seconds)
+
+    def save(self, generation: int, **state) -> None:
+        """
+
+        :param generation: номер завершённого поколения
+        :param state: состояние алгоритма (см. save_checkpoint)
+        """
+        save_checkpoint(self.path, generation=generation, **state)
+        self.saved_generation = generation
+        self.saved_time = time.monotonic()
+
+
+def save_checkpoint(path: str, **state) -> None:
+    """
+
+    :param path: путь к файлу контрольной точки (.npz)
+    :param state: массивы и числа состояния алгоритма
+
+    К состоянию добавляются состояния генераторов случайных чисел random и
+    numpy.random. Файл сначала записывается во временный файл рядом с
+    path, а затем заменяет path функцией os.replace, поэтому при
+    прерывании записи на диске остаётся предыдущая контрольная точка.
+    """
+    version, python_state, gauss_next = random.getstate()
+    _, numpy_keys, numpy_position, has_gauss, cached_gaussian = (
+        np.random.get_state())
+    temporary: str = f'{path}.tmp'
+    with open(temporary, 'wb') as file:
+        np.savez(
+            file,
+            python_random=np.array(python_state, dtype=np.uint64),
+            python_random_version=version,
+            python_gauss_next=np.nan if gauss_next is None else gauss_next,
+            numpy_random=numpy_keys,
+            numpy_random_position=numpy_position,
+            numpy_has_gauss=has_gauss,
+            numpy_cached_gaussian=cached_gaussian,
+            **state,
+        )
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: str) -> dict:
+    """
+
+    :param path: путь к файлу контрольной точки
+    :return: сохранённое состояние алгоритма
+
+    Генераторы случайных чисел random и numpy.random восстанавливаются в
+    состояние на момент записи контрольной точки.
+    """
+    with np.load(path) as data:
+        state: dict = {name: data[name] for name in data.files}
+    gauss_next: float = float(state.pop('python_gauss_next'))
+    random.setstate((
+        int(state.pop('python_random_version')),
+        tuple(state.pop('python_random').tolist()),
+        None if np.isnan(gauss_next) else gauss_next,
+    ))
+    np.random.set_state((
+        'MT19937',
+        state.pop('numpy_random'),
+        int(state.pop('numpy_random_position')),
+        int(state.pop('numpy_has_gauss')),
+        float(state.pop('numpy_cached_gaussian')),
+    ))
+    return state
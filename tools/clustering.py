@@ -0,0 +1,169 @@
+import numpy as np
+
+from tools.cache import canonical_key
+from tools.fitness import get_standard
+from tools.mutation import mutation
+from tools.population_creator import EMPTY, Population, create_individual
+
+
+def average_linkage(standard: np.ndarray = None,
+                    weighted: bool = False) -> np.ndarray:
+    """
+
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param weighted: False - UPGMA, True - WPGMA
+    :return: хромосома дерева
+
+    Иерархическая кластеризация по мерам близости: на каждом шаге
+    объединяются две самые близкие вершины, а близость новой вершины к
+    остальным равна среднему (UPGMA - с весами по размерам вершин, как в
+    fitness_recurrent; WPGMA - без весов).
+
+    Используется алгоритм цепочки ближайших соседей: цепочка продлевается
+    ближайшим соседом последней вершины, пока две последние вершины не
+    окажутся ближайшими друг для друга, и тогда они объединяются. Для
+    UPGMA и WPGMA это даёт то же дерево, что и поиск самой близкой пары,
+    но за O(n^2) операций вместо O(n^3).
+
+    Ген записывается в момент объединения: вершина называется номером своей
+    наименьшей простейшей вершины, меньшая вершина ставится на первую
+    позицию.
+    """
+    table: np.ndarray = np.array(get_standard(standard), dtype=np.float64)
+    n: int = len(table)
+    np.fill_diagonal(table, -np.inf)
+    sizes: np.ndarray = np.ones(n)
+    alive: list = list(range(n))
+    chain: list = []
+    genes: list = []
+    while len(genes) < n - 1:
+        if not chain:
+            chain.append(alive[0])
+        node: int = chain[-1]
+        nearest: int = int(table[node].argmax())
+        if len(chain) > 1 and table[node, chain[-2]] >= table[node, nearest]:
+            nearest = chain[-2]
+        if len(chain) < 2 or nearest != chain[-2]:
+            chain.append(nearest)
+            continue
+        chain.pop()
+        chain.pop()
+        node_1, node_2 = sorted((node, nearest))
+        if weighted:
+            row: np.ndarray = (table[node_1] + table[node_2]) / 2
+        else:
+            row = ((sizes[node_1] * table[node_1]
+                    + sizes[node_2] * table[node_2])
+                   / (sizes[node_1] + sizes[node_2]))
+        table[node_1] = row
+        table[:, node_1] = row
+        table[node_1, node_1] = -np.inf
+        table[node_2] = -np.inf
+        table[:, node_2] = -np.inf
+        sizes[node_1] += sizes[node_2]
+        alive.remove(node_2)
+        genes.append((node_1, node_2))
+    return np.array(genes, dtype=np.int32).reshape(n - 1, 2)
+
+
+def upgma(standard: np.ndarray = None) -> np.ndarray:
+    return average_linkage(standard)
+
+
+def wpgma(standard: np.ndarray = None) -> np.ndarray:
+    return average_linkage(standard, weighted=True)
+
+
+def neighbor_joining(standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :return: хромосома дерева
+
+    Метод присоединения соседей. Меры близости переводятся в расстояния
+    d = 1 - S, на каждом шаге объединяется пара с минимальным значением
+    Q(i, j) = (m - 2) * d(i, j) - r(i) - r(j), где m - число оставшихся
+    вершин, r - суммы расстояний. Расстояние от новой вершины до остальных
+    равно (d(i, k) + d(j, k) - d(i, j)) / 2.
+
+    Сложность - O(n^3): каждый из n - 2 шагов вычисляет всю матрицу Q за
+    O(n^2), поэтому для больших таблиц метод заметно медленнее UPGMA и
+    WPGMA (O(n^2)). Дерево метода не имеет корня, поэтому корнем становится последнее
+    объединение двух оставшихся вершин.
+    """
+    distances: np.ndarray = 1 - np.array(get_standard(standard),
+                                         dtype=np.float64)
+    n: int = len(distances)
+    np.fill_diagonal(distances, 0)
+    alive: np.ndarray = np.arange(n)
+    genes: list = []
+    while len(alive) > 2:
+        current: np.ndarray = distances[np.ix_(alive, alive)]
+        sums: np.ndarray = current.sum(axis=1)
+        q: np.ndarray = (len(alive) - 2) * current - sums[:, None] - sums
+        np.fill_diagonal(q, np.inf)
+        i, j = np.unravel_index(q.argmin(), q.shape)
+        node_1, node_2 = sorted((int(alive[i]), int(alive[j])))
+        row: np.ndarray = (distances[node_1] + distances[node_2]
+                           - distances[node_1, node_2]) / 2
+        distances[node_1] = row
+        distances[:, node_1] = row
+        distances[node_1, node_1] = 0
+        alive = alive[alive != node_2]
+        genes.append((node_1, node_2))
+    if len(alive) == 2:
+        genes.append(tuple(int(node) for node in alive))
+    return np.array(genes, dtype=np.int32).reshape(n - 1, 2)
+
+
+# Методы построения деревьев для начальной популяции. Все они принимают
+# меры близости (расстояния PHYLIP переводит tools.loader.load_phylip);
+# UPGMA и WPGMA требуют O(n^2) операций, присоединение соседей - O(n^3).
+HEURISTICS = {
+    'upgma': upgma,
+    'wpgma': wpgma,
+    'nj': neighbor_joining,
+}
+
+
+def warm_start_population(individual_size: int, population_size: int,
+                          standard: np.ndarray = None,
+                          methods: tuple = tuple(HEURISTICS)) -> Population:
+    """
+
+    :param individual_size: количество вершин двоичного дерева
+    :param population_size: размер популяции
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param methods: методы построения деревьев (ключи HEURISTICS)
+    :return: популяция, начинающаяся с деревьев методов methods
+
+    Первые особи популяции - различные деревья, построенные методами
+    methods (деревья с одинаковой топологией берутся один раз). Остальные
+    особи - мутанты этих деревьев (tools.mutation.mutation, по очереди от
+    каждого дерева), так что популяция сохраняет разнообразие, но
+    начинается рядом с хорошими решениями. Если мутация не удалась,
+    особь строится случайно.
+
+    standard - таблица мер близости, а не расстояний. Время создания
+    определяется самым медленным методом: присоединение соседей требует
+    O(n^3) операций.
+    """
+    standard = get_standard(standard)
+    if len(standard) != individual_size:
+        raise ValueError(
+            f'Таблица содержит {len(standard)} особей, '
+            f'а не {individual_size}')
+    seeds: dict = {}
+    for method in methods:
+        chromosome: np.ndarray = HEURISTICS[method](standard)
+        seeds.setdefault(canonical_key(chromosome), chromosome)
+    population = Population.empty(population_size, individual_size)
+    trees: list = list(seeds.values())
+    for i, chromosome in enumerate(population.genes):
+        tree: np.ndarray = trees[i % len(trees)]
+        if i < len(trees):
+            chromosome[:] = tree
+        elif mutation(tree, chromosome) is None:
+            chromosome.fill(EMPTY)
+            create_individual(individual_size, template=chromosome)
+    return population
@@ -1,15 +1,21 @@
-import copy
 import random
 
-from tools.population_creator import (ImpossibleToCompleteError, Individual,
-                                      create_individual, is_chromosome_valid)
+import numpy as np
 
+from tools.population_creator import (EMPTY, ImpossibleToCompleteError,
+                                      TopologyIndex, create_individual)
 
-def generate_child_template(parent1: list, parent2: list, center: int) -> list:
+
+def generate_child_template(parent1: np.ndarray, parent2: np.ndarray,
+                            center: int, child: np.ndarray = None,
+                            index: TopologyIndex = None) -> np.ndarray:
     """
     :param parent1: хромосома первого родителя
     :param parent2: хромосома второго родителя
     :param center: центр хромосом (индекс)
+    :param child: массив, в который записывается шаблон (необязательно)
+    :param index: пустой индекс топологии, который заполняется вместе с
+    шаблоном (необязательно)
     :return: шаблон дочерней особи
 
     Данная функция служит для формирования шаблонов дочерних особей, в которых
@@ -23,45 +29,48 @@ def generate_child_template(parent1: list, parent2: list, center: int) -> list:
     хромосомы формируется из подходящих генов из второй половины хромосомы
     второго родителя.
 
-    На данной этапе формируется только шаблон в виде списка, но не сам
-    экземпляр класса Individual.
+    На данной этапе формируется только шаблон, в котором незаполненные гены
+    отмечены значением EMPTY.
+
+    Для каждой пары генов сначала проверяется, можно ли взять оба гена,
+    затем только ген первого родителя, затем только ген второго. Проверка
+    выполняется по индексу топологии за O(1), без копирования шаблона.
     """
-    child = [None] * len(parent1)
+    if child is None:
+        child = np.empty_like(parent1)
+    if index is None:
+        index = TopologyIndex(len(parent1) + 1)
+    child.fill(EMPTY)
+    genes_1: list = parent1.tolist()
+    genes_2: list = parent2.tolist()
     first = list(range(center))
     second = list(range(center, len(parent1)))
     random.shuffle(first), random.shuffle(second)
     for i, j in zip(first, second):
-        gen_in_parent_1 = parent1[i]
-        gen_in_parent_2 = parent2[j]
-        for k in range(3):
-            temp = copy.copy(child)
-            if k == 0:
-                temp[i] = gen_in_parent_1
-                temp[j] = gen_in_parent_2
-                if is_chromosome_valid(temp):
-                    child[:] = temp[:]
-                    break
-            elif k == 1:
-                temp[i] = gen_in_parent_1
-                if is_chromosome_valid(temp):
-                    child[:] = temp[:]
-                    break
-            else:
-                temp[j] = gen_in_parent_2
-                if is_chromosome_valid(temp):
-                    child[:] = temp[:]
-                    break
+        gen_in_parent_1 = genes_1[i]
+        gen_in_parent_2 = genes_2[j]
+        if index.can_place(gen_in_parent_1, i):
+            index.place(gen_in_parent_1, i)
+            child[i] = gen_in_parent_1
+            if index.can_place(gen_in_parent_2, j):
+                index.place(gen_in_parent_2, j)
+                child[j] = gen_in_parent_2
+        elif index.can_place(gen_in_parent_2, j):
+            index.place(gen_in_parent_2, j)
+            child[j] = gen_in_parent_2
     return child
 
 
-def crossover(parent1: Individual, parent2: Individual,
-              center: int) -> tuple:
+def crossover(parent1: np.ndarray, parent2: np.ndarray, center: int,
+              children: tuple = (None, None)) -> tuple:
     """
 
-    :param parent1: первый родитель
-    :param parent2: второй родитель
+    :param parent1: хромосома первого родителя
+    :param parent2: хромосома второго родителя
     :param center: середина хромосомы (индекс)
-    :return: Возвращает две дочерние особи - экземпляры Individual
+    :param children: пара массивов, в которые записываются хромосомы
+    дочерних особей (необязательно)
+    :return: Возвращает хромосомы двух дочерних особей
 
     Сначала генерируем допустимый шаблон дочерних особей, после, используем
     population_creator.create_individual, передавая в эту функцию шаблон
@@ -69,18 +78,22 @@ def crossover(parent1: Individual, parent2: Individual,
     правилам, что и особи из изначальной популяци.
 
 
-    Если не удалось сгенерировать полную хромосому по шаблону, то дочерней
-    особью в этом случае будет являться первый родитель.
+    Если не удалось сгенерировать полную хромосому по шаблону, то вместо
+    дочерней особи возвращается None.
     """
     n: int = len(parent1) + 1
-    child_1_template: list = generate_child_template(parent1, parent2, center)
-    child_2_template: list = generate_child_template(parent2, parent1, center)
+    index_1 = TopologyIndex(n)
+    index_2 = TopologyIndex(n)
+    child_1_template: np.ndarray = generate_child_template(
+        parent1, parent2, center, children[0], index_1)
+    child_2_template: np.ndarray = generate_child_template(
+        parent2, parent1, center, children[1], index_2)
     try:
-        child_1 = create_individual(n, template=child_1_template)
+        child_1 = create_individual(n, child_1_template, index_1)
     except ImpossibleToCompleteError:
         child_1 = None
     try:
-        child_2 = create_individual(n, template=child_2_template)
+        child_2 = create_individual(n, child_2_template, index_2)
     except ImpossibleToCompleteError:
         child_2 = None
     return child_1, child_2
@@ -1,23 +1,36 @@
-from binarytree import Node
+import numpy as np
 
+from tools.newick import chromosome_to_tree
 
-def draw_tree(chromosome: list) -> None:
+
+def draw_tree(chromosome: np.ndarray, names: list = None) -> None:
     """
 
     :param chromosome: хромосома особи
-    :return: возвращает графическую структуру двоичного финологического
-    дерева
-    """
-    root = Node(int(chromosome[-1][0]))
-    nodes = {}
-    for gen in chromosome[::-1]:
-        start = nodes[gen[0]] if gen[0] in nodes.keys() else 0
-        for i in reversed(range(start, len(root.values))):
-            if root.values[i] == gen[0]:
-                root[i].left = Node(int(gen[0]))
-                root[i].right = Node(int(gen[1]))
-                nodes[int(gen[0])] = i
-                nodes[int(gen[1])] = i
-                break
+    :param names: имена простейших вершин (по умолчанию их номера)
+
+    Печатает двоичное филогенетическое дерево в виде текста:
 
-    print(root)
+        ┬
+        ├── 0
+        └─┬
+          ├── 1
+          └── 2
+
+    Дерево строится функцией chromosome_to_tree за O(n) и обходится без
+    рекурсии, поэтому печать подходит и для глубоких деревьев.
+    """
+    lines: list = []
+    stack: list = [(chromosome_to_tree(chromosome), '', '')]
+    while stack:
+        node, branch, indent = stack.pop()
+        if not node.children:
+            name = node.leaf if names is None else names[node.leaf]
+            lines.append(f'{branch}── {name}')
+            continue
+        lines.append(f'{branch}─┬' if branch else '┬')
+        for i, child in enumerate(reversed(node.children)):
+            last: bool = i == 0
+            stack.append((child, indent + ('└' if last else '├'),
+                          indent + ('  ' if last else '│ ')))
+    print('\n'.join(lines))
@@ -0,0 +1,147 @@
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tools.cache import cluster_masks
+from tools.fitness import get_standard
+from tools.main_algorithm import genetic_algorithm
+from tools.newick import TreeNode
+
+# Эталонная таблица процесса пула (передаётся один раз в инициализаторе).
+_worker_standard = None
+
+
+def set_standard(standard: np.ndarray) -> None:
+    global _worker_standard
+    _worker_standard = standard
+
+
+def run_seeded(seed: int, speciman_size: int, population_size: int,
+               max_generations: int, parameters: dict) -> dict:
+    """
+
+    :param seed: значение для генераторов случайных чисел
+    :param speciman_size: количество вершин
+    :param population_size: размер популяции
+    :param max_generations: максимальное количество поколений
+    :param parameters: остальные параметры genetic_algorithm
+    :return: результат запуска: seed, хромосома, приспособленность,
+    количество поколений и причина остановки
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    best, min_values, _, reason = genetic_algorithm(
+        speciman_size, population_size, max_generations,
+        standard=_worker_standard, **parameters)
+    return {
+        'seed': seed,
+        'chromosome': best,
+        'fitness': float(min_values[-1]),
+        'generations': len(min_values),
+        'stop_reason': reason,
+    }
+
+
+def clade_frequencies(chromosomes) -> dict:
+    """
+
+    :param chromosomes: итерируемый набор хромосом деревьев
+    :return: словарь {маска клады: доля деревьев, содержащих кладу}
+
+    Клада - множество простейших вершин внутренней вершины дерева, оно
+    задаётся битовой маской (tools.cache.cluster_masks). Маски - целые
+    числа, поэтому подсчёт выполняется одним словарём с хешированием масок,
+    за O(n) операций с масками на дерево. Корень (все простейшие вершины)
+    в результат не входит.
+    """
+    counter = Counter()
+    trees: int = 0
+    for chromosome in chromosomes:
+        counter.update(cluster_masks(chromosome)[:-1])
+        trees += 1
+    return {mask: count / trees for mask, count in counter.items()}
+
+
+def consensus_tree(frequencies: dict, n: int,
+                   threshold: float = 0.5) -> TreeNode:
+    """
+
+    :param frequencies: частоты клад (см. clade_frequencies)
+    :param n: количество простейших вершин
+    :param threshold: клада может войти в дерево, если её частота больше
+    threshold (0.5 - правило большинства)
+    :return: корень консенсусного дерева (внутренние вершины могут иметь
+    больше двух дочерних вершин, support - частота клады)
+
+    Клады с частотой больше половины попарно совместимы (вложены друг в
+    друга или не пересекаются), поэтому образуют дерево. При threshold
+    меньше 0.5 клады рассматриваются по убыванию частоты, и клада,
+    несовместимая с уже выбранной, пропускается (жадный консенсус), так
+    что дерево остаётся деревом.
+
+    Выбранные клады добавляются по убыванию размера; для каждой
+    простейшей вершины хранится наименьшая из добавленных клад,
+    содержащая её, - она и становится родителем следующей клады с этой
+    вершиной.
+    """
+    root = TreeNode()
+    smallest: list = [root] * n
+    clades: list = []
+    for mask in sorted(
+            (mask for mask, frequency in frequencies.items()
+             if frequency > threshold),
+            key=lambda mask: (-frequencies[mask], mask)):
+        if all(mask & other in (0, mask, other) for other in clades):
+            clades.append(mask)
+    clades.sort(key=lambda mask: -bin(mask).count('1'))
+    for mask in clades:
+        leaves: list = [leaf for leaf in range(n) if mask >> leaf & 1]
+        node = TreeNode(support=frequencies[mask])
+        smallest[leaves[0]].children.append(node)
+        for leaf in leaves:
+            smallest[leaf] = node
+    for leaf in range(n):
+        smallest[leaf].children.append(TreeNode(leaf))
+    return root
+
+
+def ensemble(speciman_size: int, population_size: int,
+             max_generations: int, runs: int = 8, processes: int = None,
+             seed: int = 0, standard: np.ndarray = None,
+             threshold: float = 0.5, **parameters) -> tuple:
+    """
+
+    :param speciman_size: количество вершин
+    :param population_size: размер популяции
+    :param max_generations: максимальное количество поколений
+    :param runs: количество независимых запусков
+    :param processes: количество процессов (по умолчанию - число ядер)
+    :param seed: seed первого запуска, запуск i получает seed + i
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param threshold: порог частоты клады для консенсусного дерева
+    :param parameters: остальные параметры genetic_algorithm (критерии
+    остановки, отбор, memetic и т.д.)
+    :return: хромосома лучшей особи, консенсусное дерево (см.
+    consensus_tree), частоты клад и результаты всех запусков (см.
+    run_seeded)
+
+    Запуски выполняются в пуле процессов, эталонная таблица передаётся
+    каждому процессу один раз. Результат не зависит от числа процессов.
+    """
+    standard = get_standard(standard)
+    with ProcessPoolExecutor(max_workers=processes, initializer=set_standard,
+                             initargs=(standard,)) as executor:
+        futures: list = [
+            executor.submit(run_seeded, seed + i, speciman_size,
+                            population_size, max_generations, parameters)
+            for i in range(runs)
+        ]
+        results: list = [future.result() for future in futures]
+    frequencies: dict = clade_frequencies(
+        result['chromosome'] for result in results)
+    best: dict = min(results, key=lambda result: result['fitness'])
+    return (best['chromosome'],
+            consensus_tree(frequencies, speciman_size, threshold),
+            frequencies, results)
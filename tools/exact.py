@@ -0,0 +1,373 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import get_context
+
+import numpy as np
+
+from tools.clustering import HEURISTICS
+from tools.fitness import fitness_batch, get_standard
+from tools.local_search import local_search
+from tools.main_algorithm import genetic_algorithm
+
+# Наибольшее количество особей, для которого solve использует точный
+# метод ветвей и границ.
+EXACT_SIZE = 12
+
+# Ветви, граница которых отличается от лучшего значения меньше чем на
+# TOLERANCE (доля суммы квадратов эталонной таблицы), не просматриваются.
+TOLERANCE = 1e-12
+
+# Через сколько вершин дерева поиска процесс сверяет лучшее значение с
+# другими процессами и проверяет ограничение времени.
+SYNC_NODES = 256
+
+
+class SearchState:
+    """
+    Состояние перебора: частичная последовательность объединений.
+
+    names - имена ещё не объединённых (живых) вершин по возрастанию
+    (наименьшая простейшая вершина), sizes - их размеры, sums - таблица
+    m x m сумм мер близости по всем парам простейших вершин двух живых
+    вершин, forbidden - таблица пар живых вершин, объединение которых
+    запрещено каноническим порядком (см. merge), genes - выполненные
+    объединения.
+
+    bound - нижняя граница суммы квадратов отклонений всех деревьев,
+    которыми можно завершить состояние: сумма по выполненным объединениям
+    и по всем парам живых вершин X, Y квадратов отклонений мер близости
+    блока X x Y от их среднего (см. children).
+    """
+
+    __slots__ = ('names', 'sizes', 'sums', 'forbidden', 'genes', 'bound')
+
+    def __init__(self, names, sizes, sums, forbidden, genes, bound):
+        self.names = names
+        self.sizes = sizes
+        self.sums = sums
+        self.forbidden = forbidden
+        self.genes = genes
+        self.bound = bound
+
+    @classmethod
+    def initial(cls, standard: np.ndarray):
+        n: int = len(standard)
+        # Блоки пар простейших вершин содержат одну меру близости и не
+        # имеют отклонений, поэтому граница равна 0.
+        return cls(list(range(n)), np.ones(n), standard.copy(),
+                   np.zeros((n, n), dtype=bool), [], 0.0)
+
+
+@lru_cache(maxsize=None)
+def masks(m: int) -> tuple:
+    """
+
+    :param m: количество живых вершин
+    :return: маска пар i < j и таблица ключей пар i * m + j
+    """
+    indexes: np.ndarray = np.arange(m)
+    return (np.triu(np.ones((m, m), dtype=bool), 1),
+            indexes[:, None] * m + indexes)
+
+
+def children(state: SearchState) -> list:
+    """
+
+    :param state: состояние перебора
+    :return: список (граница, i, j) допустимых объединений живых вершин
+    i < j, отсортированный по возрастанию границы
+
+    Граница состояния (см. SearchState) складывается из отклонений
+    выполненных объединений и блоков X x Y пар живых вершин. Объединение
+    X и Y не меняет слагаемое блока X x Y (оно становится отклонением
+    выполненного объединения), а блоки X x Z и Y x Z заменяет одним
+    блоком (X + Y) x Z. Сумма квадратов отклонений объединения блоков не
+    меньше суммы по блокам, поэтому граница не убывает вдоль ветви, а у
+    завершённого дерева равна его сумме квадратов отклонений.
+
+    Суммы квадратов мер близости при объединении блоков сокращаются, и
+    прирост границы равен
+        |X||Y| / (|X| + |Y|) * sum((M[X, Z] - M[Y, Z])^2 / |Z|)
+    по всем живым Z, кроме X и Y, где M[X, Z] = sums[X, Z] / |X|. Сумма
+    раскрывается через одно произведение матриц m x m, слагаемые с Z = X
+    и Z = Y вычитаются отдельно.
+    """
+    sizes: np.ndarray = state.sizes
+    weights: np.ndarray = 1 / sizes
+    means: np.ndarray = state.sums * weights[:, None]
+    norms: np.ndarray = (means * means) @ weights
+    distances: np.ndarray = (norms[:, None] + norms
+                             - 2 * (means * weights) @ means.T)
+    diagonal: np.ndarray = np.diagonal(means)
+    distances -= (weights[:, None] * (diagonal[:, None] - means.T) ** 2
+                  + weights * (means - diagonal) ** 2)
+    upper, _ = masks(len(sizes))
+    first, second = np.nonzero(upper & ~state.forbidden)
+    bounds: np.ndarray = state.bound + (
+        distances[first, second] * sizes[first] * sizes[second]
+        / (sizes[first] + sizes[second]))
+    order: np.ndarray = np.argsort(bounds, kind='stable')
+    return list(zip(bounds[order].tolist(), first[order].tolist(),
+                    second[order].tolist()))
+
+
+def merge(state: SearchState, i: int, j: int, bound: float) -> SearchState:
+    """
+
+    :param state: состояние перебора
+    :param i: номер первой живой вершины (i < j)
+    :param j: номер второй живой вершины
+    :param bound: граница объединения, вычисленная children
+    :return: состояние после объединения вершин
+
+    Канонический порядок: дерево задаётся множеством объединений, а
+    последовательностей объединений одного дерева много. Перебираются
+    только последовательности, в которых каждое объединение меньше (по
+    паре имён) всех объединений, доступных в момент его выполнения и
+    выполненных позже. Для этого все доступные пары с меньшим ключом
+    запрещаются, пока обе их вершины живы. Имена живых вершин
+    упорядочены, поэтому ключ пары имён можно сравнивать по номерам.
+    Каждое дерево встречается ровно один раз.
+    """
+    m: int = len(state.names)
+    upper, keys = masks(m)
+    keep: list = [k for k in range(m) if k != j]
+    forbidden: np.ndarray = state.forbidden | (upper & (keys < i * m + j))
+    forbidden[[i, j], :] = False
+    forbidden[:, [i, j]] = False
+    sums: np.ndarray = state.sums.copy()
+    sums[i] += sums[j]
+    sums[:, i] = sums[i]
+    sizes: np.ndarray = state.sizes[keep]
+    sizes[i] += state.sizes[j]
+    return SearchState(
+        state.names[:j] + state.names[j + 1:], sizes,
+        sums[keep][:, keep], forbidden[keep][:, keep],
+        state.genes + [(state.names[i], state.names[j])], bound)
+
+
+def completions(state: SearchState) -> list:
+    """
+
+    :param state: состояние перебора, в котором осталось две или три живых
+    вершины
+    :return: список (сумма квадратов отклонений, гены) всех деревьев,
+    которыми можно завершить состояние
+
+    У двух живых вершин остался один блок, и последнее объединение его не
+    меняет, поэтому значение дерева равно границе. Значит, и границы
+    children для трёх живых вершин - это точные значения деревьев, и два
+    последних уровня перебора не нужны.
+    """
+    names: list = state.names
+    if len(names) == 2:
+        return [(state.bound, state.genes + [tuple(names)])]
+    result: list = []
+    for bound, i, j in children(state):
+        rest: list = names[:j] + names[j + 1:]
+        result.append((bound, state.genes + [(names[i], names[j]),
+                                             tuple(rest)]))
+    return result
+
+
+# Лучшее значение, общее для процессов пула (multiprocessing.Value).
+_best = None
+
+
+def set_best(best) -> None:
+    global _best
+    _best = best
+
+
+def branch_and_bound(state: SearchState, incumbent: float,
+                     deadline: float = None, tolerance: float = 0.0) -> tuple:
+    """
+
+    :param state: начальное состояние ветви
+    :param incumbent: известное значение (сумма квадратов отклонений),
+    которое нужно улучшить
+    :param deadline: момент time.monotonic(), после которого перебор
+    прекращается (None - без ограничения)
+    :param tolerance: ветви, граница которых больше лучшего значения минус
+    tolerance, не просматриваются
+    :return: лучшие найденные гены (None, если не найдено ничего лучше
+    incumbent), их сумма квадратов отклонений (incumbent, если генов
+    нет), количество просмотренных состояний и признак завершения
+    перебора
+
+    Поиск в глубину без рекурсии, дочерние состояния просматриваются по
+    возрастанию границы. В стеке хранятся родительское состояние и
+    объединение, а само дочернее состояние строится только если ветвь не
+    отсечена к моменту её просмотра.
+
+    Если функция выполняется в пуле процессов branch_and_bound_parallel,
+    каждые SYNC_NODES состояний лучшее значение сверяется с другими
+    процессами (первый раз - сразу, чтобы ветвь, начатая позже других,
+    получила уже найденное значение).
+    """
+    best_genes = None
+    found: float = incumbent
+    best: float = incumbent
+    nodes: int = 0
+    stack: list = [(state.bound, state, None, None)]
+    while stack:
+        bound, parent, i, j = stack.pop()
+        nodes += 1
+        if nodes % SYNC_NODES == 1:
+            if _best is not None:
+                with _best.get_lock():
+                    if _best.value < best:
+                        best = _best.value
+                    else:
+                        _best.value = best
+            if deadline is not None and time.monotonic() > deadline:
+                return best_genes, found, nodes, False
+        if bound >= best - tolerance:
+            continue
+        current: SearchState = (parent if i is None
+                                else merge(parent, i, j, bound))
+        if len(current.names) <= 3:
+            for value, genes in completions(current):
+                if value < best - tolerance:
+                    best = found = value
+                    best_genes = genes
+            continue
+        for bound, i, j in reversed(children(current)):
+            if bound < best - tolerance:
+                stack.append((bound, current, i, j))
+    if _best is not None:
+        with _best.get_lock():
+            _best.value = min(_best.value, best)
+    return best_genes, found, nodes, True
+
+
+def branch_and_bound_parallel(state: SearchState, incumbent: float,
+                              deadline: float, processes: int,
+                              tolerance: float) -> tuple:
+    """
+
+    :param state: начальное состояние
+    :param incumbent: известное значение
+    :param deadline: момент окончания перебора или None
+    :param processes: количество процессов
+    :param tolerance: допуск сравнения границ (см. branch_and_bound)
+    :return: то же, что branch_and_bound
+
+    Ветви первого уровня (все допустимые первые объединения, по
+    возрастанию границы) перебираются в пуле процессов. Лучшее значение
+    хранится в общей переменной multiprocessing.Value, поэтому решение,
+    найденное одним процессом, сразу сокращает перебор в остальных.
+    """
+    context = get_context()
+    shared = context.Value('d', incumbent)
+    branches: list = [merge(state, i, j, bound)
+                      for bound, i, j in children(state)
+                      if bound < incumbent - tolerance]
+    best_genes = None
+    best: float = incumbent
+    nodes: int = 1
+    finished: bool = True
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=set_best,
+                             initargs=(shared,)) as executor:
+        for genes, value, branch_nodes, branch_finished in executor.map(
+                branch_and_bound, branches, [incumbent] * len(branches),
+                [deadline] * len(branches), [tolerance] * len(branches)):
+            nodes += branch_nodes
+            finished = finished and branch_finished
+            if genes is not None and value < best:
+                best_genes, best = genes, value
+    return best_genes, best, nodes, finished
+
+
+def exact_solver(standard: np.ndarray = None, time_limit: float = None,
+                 processes: int = 1) -> tuple:
+    """
+
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param time_limit: ограничение времени в секундах (None - без
+    ограничения)
+    :param processes: количество процессов для параллельного перебора
+    ветвей первого уровня (1 - в текущем процессе)
+    :return: хромосома лучшего дерева, её функция приспособленности,
+    признак доказанной оптимальности (False, если перебор прерван по
+    времени) и количество просмотренных состояний
+
+    Точный метод ветвей и границ для небольших таблиц (до EXACT_SIZE
+    особей). Деревья строятся последовательностью объединений вершин по тем
+    же правилам, что и хромосомы create_individual: ген (a, b), a < b,
+    объединяет вершины с наименьшими простейшими вершинами a и b, после
+    чего вершина b не используется. Функция приспособленности дерева равна
+    удвоенной сумме по объединениям квадратов отклонений мер близости
+    между вершинами объединения от их среднего (таблица симметрична), а
+    нижняя граница ветви описана в children.
+
+    Начальное лучшее значение - лучшее из деревьев tools.clustering,
+    улучшенное локальным поиском.
+    """
+    standard = np.asarray(get_standard(standard), dtype=np.float64)
+    n: int = len(standard)
+    if n < 2:
+        raise ValueError('Для построения дерева нужно хотя бы 2 особи')
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    heuristics: list = [
+        local_search(method(standard), standard)[0]
+        for method in HEURISTICS.values()]
+    values: np.ndarray = fitness_batch(np.array(heuristics),
+                                       standard=standard)
+    best_chromosome: np.ndarray = heuristics[int(values.argmin())]
+    best: float = float(values.min()) / 2
+    tolerance: float = TOLERANCE * float(np.sum(standard ** 2))
+    state: SearchState = SearchState.initial(standard)
+    if processes > 1 and n > 3:
+        genes, best, nodes, finished = branch_and_bound_parallel(
+            state, best, deadline, processes, tolerance)
+    else:
+        genes, best, nodes, finished = branch_and_bound(
+            state, best, deadline, tolerance)
+    if genes is not None:
+        best_chromosome = np.array(genes, dtype=np.int32)
+    fitness: float = float(fitness_batch(best_chromosome[None],
+                                         standard=standard)[0])
+    return best_chromosome, fitness, finished, nodes
+
+
+def solve(standard: np.ndarray = None, population_size: int = 100,
+          max_generations: int = 1000, exact_size: int = EXACT_SIZE,
+          time_limit: float = None, processes: int = 1,
+          **parameters) -> tuple:
+    """
+
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param population_size: размер популяции генетического алгоритма
+    :param max_generations: максимальное количество поколений
+    :param exact_size: наибольшее количество особей для точного метода
+    :param time_limit: ограничение времени точного метода в секундах
+    :param processes: количество процессов точного метода
+    :param parameters: остальные параметры genetic_algorithm
+    :return: хромосома лучшего дерева, её функция приспособленности,
+    признак доказанной оптимальности и словарь подробностей: method
+    ('exact' или 'genetic'), для точного метода - nodes (количество
+    просмотренных состояний), для генетического алгоритма -
+    min_fitness_values, mean_fitness_values и stop_reason
+
+    Для таблиц до exact_size особей используется exact_solver, для
+    больших - genetic_algorithm.
+    """
+    standard = get_standard(standard)
+    n: int = len(standard)
+    if n <= exact_size:
+        chromosome, fitness, optimal, nodes = exact_solver(
+            standard, time_limit, processes)
+        return chromosome, fitness, optimal, {'method': 'exact',
+                                              'nodes': nodes}
+    chromosome, min_values, mean_values, reason = genetic_algorithm(
+        n, population_size, max_generations, standard=standard,
+        **parameters)
+    return chromosome, float(min_values[-1]), False, {
+        'method': 'genetic',
+        'min_fitness_values': min_values,
+        'mean_fitness_values': mean_values,
+        'stop_reason': reason,
+    }
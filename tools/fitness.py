@@ -2,16 +2,38 @@ import copy
 from math import prod
 
 import numpy as np
-import pandas as pd
 
-data = pd.read_excel(
-    'data.xlsx',
-    sheet_name='1',
-    index_col=None,  # Без индексного столбца
-    header=None,  # Без строки заголовков
-)
+from tools.loader import DEFAULT_MATRIX, load_matrix
 
-STANDARD = data.to_numpy()
+# Таблица по умолчанию, загружается при первом обращении (get_standard).
+_default_standard = None
+
+
+def get_standard(standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param standard: эталонная таблица или None
+    :return: переданная эталонная таблица или таблица по умолчанию
+
+    Таблица по умолчанию (DEFAULT_MATRIX) загружается только при первом
+    обращении, поэтому импорт модуля не читает никаких файлов.
+    """
+    global _default_standard
+    if standard is not None:
+        return standard
+    if _default_standard is None:
+        _default_standard = load_matrix(DEFAULT_MATRIX)
+    return _default_standard
+
+
+def __getattr__(name: str):
+    """
+    Обратная совместимость: tools.fitness.STANDARD возвращает таблицу по
+    умолчанию.
+    """
+    if name == 'STANDARD':
+        return get_standard()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def check_if_simple(gen: list) -> bool:
@@ -43,17 +65,18 @@ def get_gen(gen: list) -> list:
     """
     final_gen: list = []
     for piece in gen:
-        if isinstance(piece, int) or isinstance(piece, np.int32):
+        if isinstance(piece, (int, np.integer)):
             final_gen.append([piece])
         else:
             final_gen.append(piece)
     return final_gen
 
 
-def calculate_dividend(gen: list) -> float:
+def calculate_dividend(gen: list, standard: np.ndarray) -> float:
     """
 
     :param gen: ген из последовательности sequence
+    :param standard: эталонная таблица
     :return: возвращает числитель
 
     Функция проходит циклом по гену из последовательности sequence,
@@ -63,7 +86,7 @@ def calculate_dividend(gen: list) -> float:
     result: float = 0.0
     for i in gen[0]:
         for j in gen[1]:
-            result += STANDARD[i][j]
+            result += standard[i][j]
     return result
 
 
@@ -159,10 +182,12 @@ def get_seq(individual: list) -> list:
     return sequence
 
 
-def table_for_individual(individual: list) -> list:
+def table_for_individual(individual: list,
+                         standard: np.ndarray = None) -> list:
     """
 
     :param individual: хромосома особи
+    :param standard: эталонная таблица (по умолчанию get_standard())
     :return: Возвращает таблицу мер близости этой особи относительно эталонной
 
     Таблица особи будет формироваться на основании эталонной таблицы и
@@ -220,13 +245,14 @@ def table_for_individual(individual: list) -> list:
         3. Вносим в таблицу значение result в ячейки R[2][1], R[2][3], R[4][1],
         R[4][3], R[0][1], R[0][3] и симметричные им.
     """
-    table: list = copy.deepcopy(STANDARD)
+    standard = get_standard(standard)
+    table: list = copy.deepcopy(standard)
     seq: list = get_seq(individual)
     for gen in seq:
         if check_if_simple(gen):
             continue
         modified_gen: list = get_gen(gen)
-        dividend: float = calculate_dividend(modified_gen)
+        dividend: float = calculate_dividend(modified_gen, standard)
         divider: int = prod(
             len(part) for part in gen if isinstance(part, list)
         )
@@ -235,10 +261,11 @@ def table_for_individual(individual: list) -> list:
     return table
 
 
-def fitness_count(individual: list) -> float:
+def fitness_count(individual: list, standard: np.ndarray = None) -> float:
     """
 
-    :param individual: экземпляр сущности Individual. Представлен хромосомой.
+    :param individual: хромосома особи
+    :param standard: эталонная таблица (по умолчанию get_standard())
     :return: Возвращает значение функции приспособленности особи
 
     Для получения функции приспособленности особи нужно иметь таблицу мер
@@ -250,6 +277,264 @@ def fitness_count(individual: list) -> float:
     Значением функции приспособленности будет сумму всех квадратичных
     отклонений в таблице.
     """
-    table: list = table_for_individual(individual)
-    quadratic_difference: list = np.power(table - STANDARD, 2)
+    standard = get_standard(standard)
+    table: list = table_for_individual(individual, standard)
+    quadratic_difference: list = np.power(table - standard, 2)
     return sum(sum(quadratic_difference))
+
+
+# Ограничение на число элементов во временных массивах fitness_batch.
+BATCH_ELEMENTS = 2 ** 22
+
+
+def membership_tables(chromosomes: np.ndarray) -> tuple:
+    """
+
+    :param chromosomes: массив хромосом формы (особи, n - 1, 2)
+    :return: две булевы таблицы принадлежности формы (особи, n - 1, n)
+
+    Для каждого гена k каждой особи таблица left[p, k] отмечает простейшие
+    вершины, входящие в вершину на первой позиции гена, а таблица
+    right[p, k] - вершины, входящие в вершину на второй позиции.
+
+    Массив labels хранит для каждой простейшей вершины имя комплексной
+    вершины, в которую она входит на текущем шаге. После обработки гена все
+    вершины второй позиции получают имя вершины первой позиции. Таким образом
+    обрабатывается сразу вся популяция, без построения вложенных списков.
+    """
+    size, genes_amount = chromosomes.shape[:2]
+    n: int = genes_amount + 1
+    labels: np.ndarray = np.tile(np.arange(n), (size, 1))
+    left: np.ndarray = np.empty((size, genes_amount, n), dtype=bool)
+    right: np.ndarray = np.empty((size, genes_amount, n), dtype=bool)
+    for k in range(genes_amount):
+        node_1: np.ndarray = chromosomes[:, k, 0:1]
+        node_2: np.ndarray = chromosomes[:, k, 1:2]
+        np.equal(labels, node_1, out=left[:, k])
+        np.equal(labels, node_2, out=right[:, k])
+        labels = np.where(right[:, k], node_1, labels)
+    return left, right
+
+
+def tables_for_population(chromosomes: np.ndarray,
+                          standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param chromosomes: массив хромосом формы (особи, n - 1, 2)
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :return: таблицы мер близости всех особей формы (особи, n, n)
+
+    Векторная версия table_for_individual. Числитель каждого гена равен
+    left @ standard @ right, а знаменатель - произведению количеств вершин
+    в обеих частях гена. Полученные средние значения раскладываются обратно
+    в таблицу тем же матричным произведением. Диагональ берётся из эталонной
+    таблицы, как и в table_for_individual.
+    """
+    standard = get_standard(standard)
+    left, right = membership_tables(chromosomes)
+    left_values: np.ndarray = left.astype(standard.dtype)
+    right_values: np.ndarray = right.astype(standard.dtype)
+    dividend: np.ndarray = np.einsum(
+        'pkj,pkj->pk', np.matmul(left_values, standard), right_values)
+    divider: np.ndarray = left.sum(axis=2) * right.sum(axis=2)
+    result: np.ndarray = dividend / divider
+    table: np.ndarray = np.matmul(
+        np.transpose(left_values * result[..., None], (0, 2, 1)),
+        right_values,
+    )
+    table += np.transpose(table, (0, 2, 1))
+    table += np.diag(np.diag(standard))
+    return table
+
+
+def fitness_batch(population: list, chunk_size: int = None,
+                  standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param population: популяция (список особей или массив хромосом)
+    :param chunk_size: количество особей, обрабатываемых за один проход
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :return: массив значений функции приспособленности всех особей
+
+    Векторная версия fitness_count: таблицы мер близости строятся сразу для
+    группы особей функцией tables_for_population. Размер группы по
+    умолчанию подбирается так, чтобы временные массивы занимали не более
+    BATCH_ELEMENTS элементов.
+
+    Эталонная таблица приводится к построчному хранению в памяти, чтобы
+    результат не зависел от того, как была загружена таблица.
+    """
+    standard = np.ascontiguousarray(get_standard(standard))
+    chromosomes: np.ndarray = np.asarray(population, dtype=np.intp)
+    result: np.ndarray = np.empty(len(chromosomes))
+    if not len(chromosomes):
+        return result
+    n: int = chromosomes.shape[1] + 1
+    if chunk_size is None:
+        chunk_size = max(1, BATCH_ELEMENTS // (n * n))
+    for start in range(0, len(chromosomes), chunk_size):
+        stop: int = start + chunk_size
+        table: np.ndarray = tables_for_population(
+            chromosomes[start:stop], standard)
+        result[start:stop] = np.power(table - standard, 2).sum(axis=(1, 2))
+    return result
+
+
+def fitness_recurrent(individual: list,
+                      standard: np.ndarray = None) -> float:
+    """
+
+    :param individual: хромосома особи
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :return: значение функции приспособленности особи (как у fitness_count)
+
+    Функция не раскрывает списки простейших вершин и не строит таблицу
+    n x n: для каждого гена нужны только размеры вершин |A|, |B| и сумма
+    P(A, B) эталонных мер близости между ними.
+
+    Средняя мера близости объединённой вершины до любой вершины X
+    пересчитывается по формуле UPGMA:
+
+        d(A + B, X) = (|A| * d(A, X) + |B| * d(B, X)) / (|A| + |B|)
+
+    то есть суммы складываются: P(A + B, X) = P(A, X) + P(B, X). В порядке
+    leaf_order каждая вершина - отрезок, поэтому P(A, B) всех генов
+    накапливаются по строкам таблицы префиксными суммами (cross_sums), на
+    особь требуется O(n) памяти.
+
+    Каждая пара простейших вершин попадает ровно в один ген, а сумма
+    квадратичных отклонений по гену равна сумме квадратов эталонных значений
+    минус P(A, B) ** 2 / (|A| * |B|). Значит, функция приспособленности равна
+    удвоенной разности суммы квадратов эталонной таблицы над диагональю и
+    суммы P(A, B) ** 2 / (|A| * |B|) по всем генам.
+
+    Для популяции эти вычисления выполняет fitness_streamed (в
+    FITNESS_FUNCTIONS - 'streamed'): таблица читается один раз для всех
+    особей, а не для каждой.
+    """
+    if not len(individual):
+        return 0.0
+    return float(fitness_streamed([individual], standard)[0])
+
+
+def leaf_order(individual: list) -> tuple:
+    """
+
+    :param individual: хромосома особи
+    :return: порядок простейших вершин, начала и размеры вершин генов
+
+    Простейшие вершины упорядочиваются так, что каждая вершина дерева
+    занимает непрерывный отрезок: при объединении вершин A и B список
+    вершин B присоединяется к концу списка A. Для гена k вершина на первой
+    позиции занимает отрезок [starts[k], starts[k] + sizes_1[k]), а вершина
+    на второй позиции - следующие sizes_2[k] позиций.
+    """
+    chromosome: list = np.asarray(individual).tolist()
+    n: int = len(chromosome) + 1
+    following: list = [-1] * n
+    heads: list = list(range(n))
+    tails: list = list(range(n))
+    sizes: list = [1] * n
+    merges: list = []
+    for node_1, node_2 in chromosome:
+        merges.append((heads[node_1], sizes[node_1], sizes[node_2]))
+        following[tails[node_1]] = heads[node_2]
+        tails[node_1] = tails[node_2]
+        sizes[node_1] += sizes[node_2]
+    order: list = []
+    node: int = heads[chromosome[-1][0]] if chromosome else 0
+    while node != -1:
+        order.append(node)
+        node = following[node]
+    positions: np.ndarray = np.empty(n, dtype=np.intp)
+    positions[order] = np.arange(n)
+    heads_1, sizes_1, sizes_2 = (np.array(column, dtype=np.intp)
+                                 for column in zip(*merges))
+    return np.array(order, dtype=np.intp), positions[heads_1], sizes_1, sizes_2
+
+
+def cross_sums(population: list, standard: np.ndarray = None) -> tuple:
+    """
+
+    :param population: популяция (список особей или массив хромосом)
+    :param standard: эталонная таблица (по умолчанию get_standard()),
+    в том числе отображённая в память и типа float32
+    :return: суммы P(A, B) эталонных значений между вершинами каждого гена
+    формы (особи, n - 1), размеры вершин |A| и |B| той же формы и сумма
+    квадратов эталонной таблицы над диагональю
+
+    В порядке leaf_order каждая вершина - отрезок, поэтому вклад строки i
+    в P(A, B) для всех генов, где i входит в A, находится по префиксным
+    суммам этой строки. Таблица читается по одной строке за раз, каждая
+    строка читается один раз для всей популяции; суммы накапливаются в
+    float64 независимо от типа таблицы. На особь требуется O(n) памяти.
+    """
+    standard = get_standard(standard)
+    chromosomes: np.ndarray = np.asarray(population, dtype=np.intp)
+    size: int = len(chromosomes)
+    n: int = chromosomes.shape[1] + 1
+    orders, starts, sizes_1, sizes_2 = (np.stack(column) for column in zip(
+        *(leaf_order(chromosome) for chromosome in chromosomes)))
+    positions: np.ndarray = np.argsort(orders, axis=1)
+    ends: np.ndarray = starts + sizes_1
+    stops: np.ndarray = ends + sizes_2
+    sums: np.ndarray = np.zeros((size, n - 1))
+    squares: float = 0.0
+    prefix: np.ndarray = np.zeros((size, n + 1))
+    rows: np.ndarray = np.arange(size)[:, None]
+    for i in range(n):
+        row: np.ndarray = np.asarray(standard[i], dtype=np.float64)
+        squares += np.dot(row[i + 1:], row[i + 1:])
+        np.cumsum(row[orders], axis=1, out=prefix[:, 1:])
+        position: np.ndarray = positions[:, i:i + 1]
+        inside: np.ndarray = (starts <= position) & (position < ends)
+        sums += np.where(
+            inside, prefix[rows, stops] - prefix[rows, ends], 0.0)
+    return sums, sizes_1, sizes_2, squares
+
+
+def fitness_streamed(population: list,
+                     standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param population: популяция (список особей или массив хромосом)
+    :param standard: эталонная таблица (по умолчанию get_standard()),
+    в том числе отображённая в память и типа float32
+    :return: массив значений функции приспособленности всех особей
+
+    Версия fitness_batch для больших таблиц: ни для особи, ни для популяции
+    не строится таблица n x n, на особь требуется O(n) памяти.
+
+    Функция приспособленности равна удвоенной разности суммы квадратов
+    эталонной таблицы над диагональю и суммы P(A, B) ** 2 / (|A| * |B|) по
+    всем генам, где P(A, B) - сумма эталонных значений между вершинами гена
+    (см. fitness_recurrent и cross_sums).
+    """
+    if not len(population):
+        return np.empty(0)
+    sums, sizes_1, sizes_2, squares = cross_sums(population, standard)
+    return 2 * (squares - (sums ** 2 / (sizes_1 * sizes_2)).sum(axis=1))
+
+
+def merge_averages(individual: list,
+                   standard: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param individual: хромосома особи
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :return: средние меры близости между вершинами каждого гена
+
+    Это значения, которые table_for_individual записывает в таблицу для
+    каждого гена, вычисленные за O(n) памяти (см. cross_sums).
+    """
+    sums, sizes_1, sizes_2, _ = cross_sums([individual], standard)
+    return sums[0] / (sizes_1[0] * sizes_2[0])
+
+
+# Функции приспособленности популяции, из которых выбирает genetic_algorithm.
+# fitness_recurrent - это 'streamed' для одной особи, поэтому отдельно не
+# регистрируется.
+FITNESS_FUNCTIONS = {
+    'batch': fitness_batch,
+    'streamed': fitness_streamed,
+}
@@ -0,0 +1,237 @@
+import multiprocessing
+import queue
+import random
+from functools import partial
+
+import numpy as np
+
+from tools.cache import FitnessCache
+from tools.fitness import fitness_batch, get_standard
+from tools.local_search import local_search
+from tools.main_algorithm import evaluate_population, next_generation
+from tools.operator_rates import OperatorRates
+from tools.population_creator import Population, create_population
+
+TOPOLOGIES = ('ring', 'complete')
+
+
+def migration_targets(index: int, islands: int, topology: str) -> list:
+    """
+
+    :param index: номер острова
+    :param islands: количество островов
+    :param topology: топология обмена особями ('ring' или 'complete')
+    :return: номера островов, которым остров отправляет своих лучших особей
+
+    В кольцевой топологии остров отправляет особей только следующему
+    острову, в полносвязной - всем остальным островам.
+    """
+    if topology == 'ring':
+        return [(index + 1) % islands]
+    if topology == 'complete':
+        return [i for i in range(islands) if i != index]
+    raise ValueError(
+        f'Неизвестная топология {topology!r}, допустимые: {TOPOLOGIES}')
+
+
+def receive_migrants(inbox, pending: dict, generation: int,
+                     expected: int) -> list:
+    """
+
+    :param inbox: очередь входящих сообщений острова
+    :param pending: сообщения, пришедшие раньше своего поколения
+    :param generation: поколение текущего обмена
+    :param expected: количество ожидаемых сообщений
+    :return: популяция из полученных особей
+
+    Соседние острова могут обогнать текущий остров и прислать особей
+    следующего обмена раньше, чем придут все особи текущего. Такие сообщения
+    откладываются в pending до своего поколения.
+    """
+    messages: list = pending.pop(generation, [])
+    while len(messages) < expected:
+        message_generation, migrants = inbox.get()
+        if message_generation == generation:
+            messages.append(migrants)
+        else:
+            pending.setdefault(message_generation, []).append(migrants)
+    return Population(
+        np.concatenate([genes for genes, _ in messages]),
+        np.concatenate([fitness for _, fitness in messages]),
+    )
+
+
+def run_island(index: int, seed: int, speciman_size: int,
+               population_size: int, max_generations: int,
+               migration_interval: int, migrants_amount: int,
+               topology: str, standard: np.ndarray, inboxes: list,
+               results, options: dict = None) -> None:
+    """
+
+    :param index: номер острова
+    :param seed: начальное значение генераторов случайных чисел
+    :param speciman_size: количество вершин
+    :param population_size: размер популяции острова
+    :param max_generations: количество поколений
+    :param migration_interval: количество поколений между обменами особями
+    :param migrants_amount: количество особей, отправляемых соседу
+    :param topology: топология обмена особями
+    :param standard: эталонная таблица
+    :param inboxes: входящие очереди всех островов
+    :param results: очередь для результатов
+    :param options: параметры поколения (selection, elitism, memetic,
+    init, unique, sharing, rates - см. genetic_algorithm)
+
+    Остров - это отдельная популяция, которая развивается обычным
+    генетическим алгоритмом (next_generation) в своём процессе. Каждые
+    migration_interval поколений остров отправляет migrants_amount лучших
+    особей соседям, а полученными особями заменяет своих худших особей.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    islands: int = len(inboxes)
+    targets: list = migration_targets(index, islands, topology)
+    sources_amount: int = sum(
+        index in migration_targets(i, islands, topology)
+        for i in range(islands)
+    )
+    pending: dict = {}
+    options = dict(options or {})
+    init: str = options.pop('init', 'random')
+    cache = FitnessCache()
+    evaluator = partial(fitness_batch, standard=standard)
+    population: Population = create_population(
+        speciman_size, population_size, init, standard)
+    evaluate_population(population, cache, evaluator)
+    offspring = Population.empty(4 * population_size, speciman_size)
+    center: int = speciman_size // 2
+    min_fitness_values: list = []
+    mean_fitness_values: list = []
+    for generation in range(1, max_generations + 1):
+        population = next_generation(
+            population, population_size, center, cache, evaluator,
+            offspring, improve=partial(local_search, standard=standard),
+            **options)
+        if (generation % migration_interval == 0
+                and generation < max_generations):
+            migrants: tuple = (
+                population.genes[:migrants_amount].copy(),
+                population.fitness[:migrants_amount].copy(),
+            )
+            for target in targets:
+                inboxes[target].put((generation, migrants))
+            arrived: Population = receive_migrants(
+                inboxes[index], pending, generation, sources_amount)
+            genes: np.ndarray = np.concatenate(
+                [population.genes, arrived.genes])
+            fitness: np.ndarray = np.concatenate(
+                [population.fitness, arrived.fitness])
+            best: np.ndarray = np.argsort(fitness, kind='stable')
+            population = Population(
+                genes[best[:population_size]], fitness[best[:population_size]])
+        min_fitness_values.append(float(population.fitness.min()))
+        mean_fitness_values.append(float(population.fitness.mean()))
+    best_index: int = population.fitness.argmin()
+    results.put((
+        index,
+        population.genes[best_index].copy(),
+        float(population.fitness[best_index]),
+        min_fitness_values,
+        mean_fitness_values,
+    ))
+
+
+def island_model(speciman_size: int, population_size: int,
+                 max_generations: int, islands: int = 4,
+                 migration_interval: int = 50, migrants_amount: int = 5,
+                 topology: str = 'ring', seed: int = None,
+                 standard: np.ndarray = None,
+                 selection: str = 'truncation', elitism: int = 1,
+                 memetic: int = 0, init: str = 'random',
+                 unique: bool = True, sharing: float = 0.0,
+                 rates: OperatorRates = None) -> tuple:
+    """
+
+    :param speciman_size: количество вершин
+    :param population_size: размер популяции каждого острова
+    :param max_generations: количество поколений
+    :param islands: количество островов (процессов)
+    :param migration_interval: количество поколений между обменами особями
+    :param migrants_amount: количество особей, отправляемых соседу
+    :param topology: топология обмена особями ('ring' или 'complete')
+    :param seed: начальное значение генераторов случайных чисел (остров i
+    получает seed + i)
+    :param standard: эталонная таблица (по умолчанию загружается
+    tools.loader.DEFAULT_MATRIX)
+    :param selection: способ отбора на островах
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :param memetic: количество лучших особей, улучшаемых локальным поиском
+    :param init: способ создания начальных популяций островов
+    :param unique: отбирать ли только особи с различной топологией
+    :param sharing: радиус ниши для разделения приспособленности
+    :param rates: вероятности операторов (каждый остров получает свою
+    копию, адаптивные вероятности подстраиваются на острове независимо)
+    :return: хромосома лучшей особи среди всех островов и статистика по
+    островам - список пар (минимальная, средняя приспособленность по
+    поколениям)
+
+    Островная модель генетического алгоритма: islands независимых популяций
+    развиваются в отдельных процессах и периодически обмениваются лучшими
+    особями. Каждый остров использует те же скрещивание, мутацию и отбор,
+    что и genetic_algorithm.
+
+    Стационарный режим и критерии досрочной остановки на островах не
+    используются: острова обмениваются особями в одних и тех же
+    поколениях, поэтому каждый остров выполняет все max_generations
+    поколений. Функция приспособленности - fitness_batch в процессе
+    острова.
+    """
+    if islands < 2:
+        raise ValueError(
+            f'Для островной модели нужно хотя бы 2 острова, а не {islands}')
+    migration_targets(0, islands, topology)
+    options: dict = {
+        'selection': selection,
+        'elitism': elitism,
+        'memetic': memetic,
+        'init': init,
+        'unique': unique,
+        'sharing': sharing,
+        'rates': rates,
+    }
+    standard = get_standard(standard)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    inboxes: list = [multiprocessing.Queue() for _ in range(islands)]
+    results = multiprocessing.Queue()
+    processes: list = [
+        multiprocessing.Process(
+            target=run_island,
+            args=(index, seed + index, speciman_size, population_size,
+                  max_generations, migration_interval, migrants_amount,
+                  topology, standard, inboxes, results, options),
+            daemon=True,
+        )
+        for index in range(islands)
+    ]
+    for process in processes:
+        process.start()
+    finished: dict = {}
+    while len(finished) < islands:
+        try:
+            index, *island_result = results.get(timeout=1)
+        except queue.Empty:
+            if any(process.exitcode for process in processes):
+                for process in processes:
+                    process.terminate()
+                raise RuntimeError('Процесс острова завершился с ошибкой')
+            continue
+        finished[index] = island_result
+    for process in processes:
+        process.join()
+    best_individual, *_ = min(
+        finished.values(), key=lambda island_result: island_result[1])
+    statistics: list = [
+        (finished[index][2], finished[index][3]) for index in range(islands)
+    ]
+    return best_individual, statistics
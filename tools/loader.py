@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+
+# Таблица, которая загружается, если эталонная таблица не передана явно.
+DEFAULT_MATRIX = 'data.xlsx'
+
+
+def load_npy(path: str, mmap: bool = True) -> np.ndarray:
+    """
+
+    :param path: путь к файлу .npy
+    :param mmap: отображать ли файл в память вместо чтения
+    :return: эталонная таблица
+
+    Отображённая в память таблица доступна только для чтения и не
+    копируется, поэтому несколько процессов могут использовать один файл.
+    """
+    return np.load(path, mmap_mode='r' if mmap else None)
+
+
+def load_csv(path: str, delimiter: str = ',') -> np.ndarray:
+    """
+
+    :param path: путь к файлу .csv (без строки заголовков)
+    :param delimiter: разделитель значений
+    :return: эталонная таблица
+    """
+    return np.loadtxt(path, delimiter=delimiter, ndmin=2)
+
+
+def load_phylip(path: str, similarity: bool = True) -> np.ndarray:
+    """
+
+    :param path: путь к файлу матрицы расстояний в формате PHYLIP
+    :param similarity: переводить ли расстояния в меры близости
+    :return: эталонная таблица
+
+    Первая строка файла содержит количество особей n, далее для каждой
+    особи идёт её имя и значения строки таблицы. Поддерживаются квадратная
+    и нижнетреугольная (с диагональю или без) записи; значения строки могут
+    быть перенесены на несколько строк файла. Формат определяется по общему
+    количеству значений.
+
+    Файлы PHYLIP содержат расстояния, а эталонная таблица алгоритма (и
+    методы tools.clustering) - меры близости, поэтому по умолчанию
+    расстояния d переводятся в меры близости 1 - d / max(d): у одинаковых
+    особей близость 1, у самых далёких - 0. При similarity=False
+    возвращаются сами расстояния.
+    """
+    with open(path) as file:
+        tokens: list = file.read().split()
+    n: int = int(tokens[0])
+    values_amount: int = len(tokens) - 1 - n
+    if values_amount == n * n:
+        lengths: list = [n] * n
+    elif values_amount == n * (n - 1) // 2:
+        lengths = list(range(n))
+    elif values_amount == n * (n + 1) // 2:
+        lengths = list(range(1, n + 1))
+    else:
+        raise ValueError(f'{path}: неверное количество значений в таблице')
+    matrix: np.ndarray = np.zeros((n, n))
+    position: int = 1
+    for i, length in enumerate(lengths):
+        row: list = tokens[position + 1:position + 1 + length]
+        matrix[i, :length] = np.array(row, dtype=float)
+        position += 1 + length
+    if values_amount != n * n:
+        lower: np.ndarray = np.tril(matrix, -1)
+        matrix = lower + lower.T + np.diag(np.diag(matrix))
+    if similarity:
+        largest: float = matrix.max()
+        matrix = 1 - (matrix / largest if largest > 0 else matrix)
+    return matrix
+
+
+def load_xlsx(path: str, sheet_name: str = '1') -> np.ndarray:
+    """
+
+    :param path: путь к файлу .xlsx
+    :param sheet_name: имя листа с таблицей
+    :return: эталонная таблица
+
+    Медленный способ загрузки: требует pandas и openpyxl, поэтому pandas
+    импортируется только при вызове этой функции.
+    """
+    import pandas as pd
+
+    data = pd.read_excel(
+        path,
+        sheet_name=sheet_name,
+        index_col=None,  # Без индексного столбца
+        header=None,  # Без строки заголовков
+    )
+    return data.to_numpy()
+
+
+LOADERS = {
+    '.npy': load_npy,
+    '.csv': load_csv,
+    '.phy': load_phylip,
+    '.phylip': load_phylip,
+    '.dist': load_phylip,
+    '.xlsx': load_xlsx,
+}
+
+
+def load_matrix(path: str, **kwargs) -> np.ndarray:
+    """
+
+    :param path: путь к файлу эталонной таблицы
+    :param kwargs: параметры функции загрузки выбранного формата
+    :return: эталонная таблица
+
+    Формат определяется по расширению файла (см. LOADERS).
+    """
+    extension: str = os.path.splitext(path)[1].lower()
+    if extension not in LOADERS:
+        raise ValueError(
+            f'Неизвестный формат таблицы {extension!r}, '
+            f'допустимые: {", ".join(LOADERS)}')
+    return LOADERS[extension](path, **kwargs)
@@ -0,0 +1,206 @@
+import numpy as np
+
+from tools.fitness import get_standard
+
+# Минимальный относительный выигрыш хода (доля суммы квадратов эталонной
+# таблицы), меньшие выигрыши считаются ошибкой округления.
+TOLERANCE = 1e-12
+
+
+def build_tree(chromosome: np.ndarray) -> tuple:
+    """
+
+    :param chromosome: хромосома особи
+    :return: дочерние вершины (список пар) и родители (список) всех вершин
+
+    Простейшие вершины имеют номера 0 ... n - 1, вершина, образованная k-м
+    геном, - номер n + k, корень дерева - 2n - 2. Для простейших вершин
+    дочерние вершины равны None.
+    """
+    n: int = len(chromosome) + 1
+    children: list = [None] * (2 * n - 1)
+    parents: list = [None] * (2 * n - 1)
+    current: list = list(range(n))
+    for k, (node_1, node_2) in enumerate(np.asarray(chromosome).tolist()):
+        node: int = n + k
+        children[node] = [current[node_1], current[node_2]]
+        parents[current[node_1]] = parents[current[node_2]] = node
+        current[node_1] = node
+    return children, parents
+
+
+def preorder(children: list) -> list:
+    """
+
+    :param children: дочерние вершины (см. build_tree)
+    :return: вершины дерева в прямом порядке обхода (корень первый)
+
+    Каждое поддерево занимает в списке непрерывный отрезок, поэтому
+    простейшие вершины в этом порядке образуют отрезок для каждой вершины.
+    """
+    order: list = []
+    stack: list = [len(children) - 1]
+    while stack:
+        node: int = stack.pop()
+        order.append(node)
+        if children[node] is not None:
+            stack.extend(reversed(children[node]))
+    return order
+
+
+def encode_tree(children: list, order: list) -> np.ndarray:
+    """
+
+    :param children: дочерние вершины (см. build_tree)
+    :param order: вершины в прямом порядке обхода (см. preorder)
+    :return: хромосома дерева
+
+    Гены записываются в обратном прямом порядке (дочерние вершины раньше
+    родительской). Вершина называется номером своей наименьшей простейшей
+    вершины, поэтому ген - это пара наименьших простейших вершин дочерних
+    вершин, меньшая на первой позиции.
+    """
+    minimums: list = list(range(len(children)))
+    genes: list = []
+    for node in reversed(order):
+        if children[node] is None:
+            continue
+        left, right = children[node]
+        node_1, node_2 = sorted((minimums[left], minimums[right]))
+        minimums[node] = node_1
+        genes.append((node_1, node_2))
+    return np.array(genes, dtype=np.int32)
+
+
+def nni_gains(children: list, parents: list, order: list,
+              standard: np.ndarray) -> tuple:
+    """
+
+    :param children: дочерние вершины (см. build_tree)
+    :param parents: родительские вершины
+    :param order: вершины в прямом порядке обхода
+    :param standard: эталонная таблица
+    :return: массивы вершин v, выигрышей и номеров лучшего варианта хода
+
+    Функция приспособленности равна 2 * (sum(S ** 2) - G), где G - сумма
+    P(L, R) ** 2 / (|L| * |R|) по всем внутренним вершинам с дочерними
+    вершинами L и R, а P(X, Y) - сумма эталонных значений между X и Y.
+
+    Ход NNI по ребру (u, v), где v = (A, B) - дочерняя вершина u = (v, C),
+    меняет местами C с B (вариант 1) или с A (вариант 2). При этом
+    меняются слагаемые G только для вершин u и v, а они выражаются через
+    P(A, B), P(A, C) и P(B, C). Простейшие вершины упорядочены так, что
+    каждая вершина - отрезок, поэтому каждая сумма P находится за O(1) по
+    двумерным префиксным суммам эталонной таблицы.
+    """
+    n: int = (len(children) + 1) // 2
+    leaves: list = [node for node in order if node < n]
+    starts: np.ndarray = np.zeros(len(children), dtype=np.intp)
+    sizes: np.ndarray = np.ones(len(children), dtype=np.intp)
+    position: int = n
+    for node in reversed(order):
+        if children[node] is None:
+            position -= 1
+            starts[node] = position
+        else:
+            left, right = children[node]
+            starts[node] = starts[left]
+            sizes[node] = sizes[left] + sizes[right]
+    table: np.ndarray = np.asarray(standard, dtype=np.float64)[
+        np.ix_(leaves, leaves)]
+    # Сдвиг на среднее уменьшает префиксные суммы и ошибку округления.
+    shift: float = table.mean()
+    prefix: np.ndarray = np.zeros((n + 1, n + 1))
+    prefix[1:, 1:] = (table - shift).cumsum(axis=0).cumsum(axis=1)
+
+    nodes: np.ndarray = np.array([
+        node for node in range(n, len(children) - 1)], dtype=np.intp)
+    a: np.ndarray = np.array([children[v][0] for v in nodes], dtype=np.intp)
+    b: np.ndarray = np.array([children[v][1] for v in nodes], dtype=np.intp)
+    c: np.ndarray = np.array([
+        sum(children[parents[v]]) - v for v in nodes], dtype=np.intp)
+
+    def cross(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        x_0, x_1 = starts[x], starts[x] + sizes[x]
+        y_0, y_1 = starts[y], starts[y] + sizes[y]
+        return (prefix[x_1, y_1] - prefix[x_0, y_1] - prefix[x_1, y_0]
+                + prefix[x_0, y_0] + shift * sizes[x] * sizes[y])
+
+    p_ab, p_ac, p_bc = cross(a, b), cross(a, c), cross(b, c)
+    size_a, size_b, size_c = sizes[a], sizes[b], sizes[c]
+    current: np.ndarray = (p_ab ** 2 / (size_a * size_b)
+                           + (p_ac + p_bc) ** 2 / ((size_a + size_b) * size_c))
+    first: np.ndarray = (p_ac ** 2 / (size_a * size_c)
+                         + (p_ab + p_bc) ** 2 / ((size_a + size_c) * size_b))
+    second: np.ndarray = (p_bc ** 2 / (size_b * size_c)
+                          + (p_ab + p_ac) ** 2 / ((size_b + size_c) * size_a))
+    variants: np.ndarray = np.where(first >= second, 1, 2)
+    return nodes, np.maximum(first, second) - current, variants
+
+
+def apply_nni(children: list, parents: list, v: int, variant: int) -> None:
+    """
+
+    :param children: дочерние вершины (изменяются)
+    :param parents: родительские вершины (изменяются)
+    :param v: дочерняя вершина ребра (u, v)
+    :param variant: 1 - поменять местами C и B, 2 - поменять местами C и A
+    """
+    u: int = parents[v]
+    a, b = children[v]
+    c: int = sum(children[u]) - v
+    moved: int = b if variant == 1 else a
+    children[v] = [a, c] if variant == 1 else [b, c]
+    children[u] = [v, moved]
+    parents[c] = v
+    parents[moved] = u
+
+
+def local_search(chromosome: np.ndarray, standard: np.ndarray = None,
+                 max_passes: int = 10) -> tuple:
+    """
+
+    :param chromosome: хромосома особи
+    :param standard: эталонная таблица (по умолчанию get_standard())
+    :param max_passes: максимальное количество проходов
+    :return: хромосома улучшенной особи и количество выполненных ходов
+
+    Локальный поиск ходами NNI (перестановка соседних поддеревьев).
+
+    За один проход выигрыши всех ходов вычисляются за O(n) после O(n^2)
+    подготовки (см. nni_gains), без пересчёта функции приспособленности
+    всего дерева. Затем в порядке убывания выигрыша выполняются улучшающие
+    ходы, не затрагивающие вершин уже выполненных ходов этого прохода, -
+    выигрыши таких ходов не зависят друг от друга. Поиск заканчивается,
+    когда улучшающих ходов не осталось или выполнено max_passes проходов.
+
+    Если ходов не было, возвращается исходная хромосома; иначе дерево
+    кодируется заново функцией encode_tree.
+    """
+    standard = get_standard(standard)
+    children, parents = build_tree(chromosome)
+    threshold: float = TOLERANCE * float(
+        np.square(np.asarray(standard, dtype=np.float64)).sum())
+    moves: int = 0
+    order: list = preorder(children)
+    for _ in range(max_passes):
+        nodes, gains, variants = nni_gains(children, parents, order, standard)
+        touched: set = set()
+        passed: int = 0
+        for i in np.argsort(-gains, kind='stable'):
+            if gains[i] <= threshold:
+                break
+            v: int = int(nodes[i])
+            u: int = parents[v]
+            if u in touched or v in touched:
+                continue
+            apply_nni(children, parents, v, variants[i])
+            touched.update((u, v))
+            passed += 1
+        if not passed:
+            break
+        moves += passed
+        order = preorder(children)
+    if not moves:
+        return chromosome, 0
+    return encode_tree(children, order), moves
@@ -1,20 +1,399 @@
 import random
+import time
+from contextlib import ExitStack, nullcontext
+from functools import partial
 
+import numpy as np
+
+from tools.backends import get_backend
+from tools.cache import FitnessCache, canonical_key
+from tools.checkpoint import Checkpointer, load_checkpoint
 from tools.crossover import crossover
-from tools.fitness import fitness_count
+from tools.fitness import FITNESS_FUNCTIONS, fitness_batch, get_standard
+from tools.local_search import local_search
 from tools.mutation import mutation
-from tools.population_creator import create_population
-from tools.selection import clone
+from tools.niching import survivors
+from tools.observer import STAGES, GenerationStats, generation_record
+from tools.operator_rates import OperatorRates
+from tools.parallel import ParallelEvaluator
+from tools.population_creator import Population, create_population
+from tools.selection import select_tournament
+from tools.stopping import MAX_GENERATIONS, StoppingCriteria
+
+
+def evaluate_population(population: Population, cache: FitnessCache,
+                        evaluator=fitness_batch) -> None:
+    """
+
+    :param population: популяция
+    :param cache: кэш значений функции приспособленности
+    :param evaluator: функция, вычисляющая значения функции
+    приспособленности для массива хромосом (fitness_batch или
+    ParallelEvaluator)
+
+    Функция приспособленности вычисляется только для особей, у которых она
+    ещё не известна (population.valid). Сначала значение ищется в кэше по
+    каноническому ключу хромосомы, оставшиеся особи оцениваются одним
+    вызовом evaluator. Особи с одинаковой топологией оцениваются один раз.
+    """
+    missing: dict = {}
+    for i in np.flatnonzero(~population.valid):
+        key: bytes = canonical_key(population.genes[i])
+        value = cache.get(key)
+        if value is None:
+            missing.setdefault(key, []).append(i)
+            continue
+        population.fitness[i] = value
+    fitness_values: np.ndarray = evaluator(
+        population.genes[[indexes[0] for indexes in missing.values()]])
+    for (key, indexes), fitness_value in zip(
+            missing.items(), fitness_values):
+        cache.put(key, fitness_value)
+        population.fitness[indexes] = fitness_value
+
+
+def update_rates(rates: OperatorRates, stats: GenerationStats,
+                 current: Population, sources: np.ndarray,
+                 rows: dict) -> None:
+    """
+
+    :param rates: вероятности операторов
+    :param stats: объект для счётчиков поколения
+    :param current: оценённые родители и потомки
+    :param sources: для каждого потомка - строка лучшего из его родителей
+    в current
+    :param rows: {оператор: номера строк его потомков в current}
+
+    Потомок успешен, если он лучше лучшего из своих родителей.
+    """
+    successes: dict = {}
+    attempts: dict = {}
+    for name, indexes in rows.items():
+        indexes = np.asarray(indexes, dtype=np.intp)
+        improved: np.ndarray = (current.fitness[indexes]
+                                < current.fitness[sources[indexes]])
+        successes[name] = int(improved.sum())
+        attempts[name] = len(indexes)
+        stats.count(f'{name}_successes', successes[name])
+    rates.update(successes, attempts)
+
+
+def next_generation(population: Population, population_size: int,
+                    center: int, cache: FitnessCache,
+                    evaluator=fitness_batch,
+                    offspring: Population = None,
+                    selection: str = 'truncation',
+                    elitism: int = 1,
+                    stats: GenerationStats = None,
+                    improve=None, memetic: int = 0,
+                    unique: bool = True,
+                    sharing: float = 0.0,
+                    rates: OperatorRates = None) -> Population:
+    """
+
+    :param population: текущая популяция
+    :param population_size: размер популяции
+    :param center: середина хромосомы (индекс)
+    :param cache: кэш значений функции приспособленности
+    :param evaluator: функция вычисления приспособленности массива хромосом
+    :param offspring: буфер для родителей, потомков и мутантов размером
+    не менее 4 * len(population) (по умолчанию создаётся заново)
+    :param selection: способ отбора (см. tools.selection.SELECTIONS)
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :param stats: объект для времени этапов и счётчиков поколения
+    (см. tools.observer.GenerationStats)
+    :param improve: функция локального поиска, возвращающая улучшенную
+    хромосому и количество ходов (см. tools.local_search.local_search)
+    :param memetic: количество лучших особей, улучшаемых функцией improve
+    :param unique: отбирать ли только особи с различной топологией (см.
+    tools.niching.survivors)
+    :param sharing: радиус ниши для разделения приспособленности, 0 - без
+    разделения
+    :param rates: вероятности скрещивания пары и мутации особи (см.
+    tools.operator_rates.OperatorRates), по умолчанию скрещиваются все
+    пары и мутируют все особи
+    :return: популяция следующего поколения
+
+    Одно поколение генетического алгоритма: скрещивание - мутация - отбор.
+
+    Родители копируются в начало буфера offspring, потомки и мутанты
+    записываются в следующие свободные строки буфера. Отобранные особи
+    копируются обратно в массивы population, поэтому при повторном
+    использовании буфера поколение не создаёт новых объектов особей.
+    Возвращаемая популяция отсортирована по возрастанию функции
+    приспособленности.
+    """
+    if stats is None:
+        stats = GenerationStats()
+    stats.declare(*STAGES)
+    size: int = len(population)
+    if offspring is None:
+        offspring = Population.empty(4 * size, population.genes.shape[1] + 1)
+    crossover_rate: float = 1.0 if rates is None else rates.crossover
+    mutation_rate: float = 1.0 if rates is None else rates.mutation
+    sources: np.ndarray = np.empty(len(offspring), dtype=np.intp)
+    order: list = list(range(size))
+    random.shuffle(order)
+    offspring.genes[:size] = population.genes[order]
+    offspring.fitness[:size] = population.fitness[order]
+    count: int = size
+    attempts: int = 0
+    with stats.stage('crossover'):
+        for i in range(0, size - 1, 2):
+            if crossover_rate < 1 and random.random() >= crossover_rate:
+                continue
+            attempts += 2
+            child_1, child_2 = crossover(
+                offspring.genes[i], offspring.genes[i + 1], center,
+                children=(offspring.genes[count], offspring.genes[count + 1]),
+            )
+            better: int = (
+                i if offspring.fitness[i] <= offspring.fitness[i + 1]
+                else i + 1)
+            if child_1 is not None:
+                offspring.fitness[count] = np.nan
+                sources[count] = better
+                count += 1
+            if child_2 is not None:
+                offspring.genes[count] = child_2
+                offspring.fitness[count] = np.nan
+                sources[count] = better
+                count += 1
+    children: int = count - size
+    stats.count('children', children)
+    stats.count('crossover_failures', attempts - children)
+    parents: int = count
+    attempts = 0
+    with stats.stage('mutation'):
+        for i in range(parents):
+            if mutation_rate < 1 and random.random() >= mutation_rate:
+                continue
+            attempts += 1
+            mutant = mutation(offspring.genes[i], offspring.genes[count])
+            if mutant is not None:
+                offspring.fitness[count] = np.nan
+                sources[count] = i
+                count += 1
+    stats.count('mutants', count - parents)
+    stats.count('mutation_failures', attempts - (count - parents))
+    current: Population = offspring[:count]
+    with stats.stage('evaluation'):
+        evaluate_population(current, cache, evaluator)
+    if rates is not None:
+        update_rates(rates, stats, current, sources, {
+            'crossover': range(size, parents),
+            'mutation': range(parents, count)})
+    with stats.stage('selection'):
+        best_offspring, duplicates = survivors(
+            current.fitness, current.genes, population_size, selection,
+            elitism, unique, sharing)
+        if len(population) != len(best_offspring):
+            population = Population.empty(
+                len(best_offspring), population.genes.shape[1] + 1)
+        np.take(current.genes, best_offspring, axis=0, out=population.genes)
+        np.take(current.fitness, best_offspring, out=population.fitness)
+    stats.count('duplicates', duplicates)
+    if improve is not None and memetic:
+        improved: int = 0
+        with stats.stage('local_search'):
+            for i in range(min(memetic, len(population))):
+                chromosome, moves = improve(population.genes[i])
+                if moves:
+                    population.genes[i] = chromosome
+                    population.fitness[i] = np.nan
+                    improved += 1
+            evaluate_population(population, cache, evaluator)
+            order: np.ndarray = np.argsort(population.fitness, kind='stable')
+            population.genes[:] = population.genes[order]
+            population.fitness[:] = population.fitness[order]
+        stats.count('improved', improved)
+    return population
+
+
+def select_parents(fitness: np.ndarray, tournament_size: int) -> tuple:
+    """
+
+    :param fitness: значения функции приспособленности (не меньше двух)
+    :param tournament_size: количество особей в турнире
+    :return: индексы двух различных особей
+
+    Оба родителя выбираются турнирным отбором, второй - среди остальных
+    особей, поэтому особь не скрещивается сама с собой.
+    """
+    i: int = int(select_tournament(fitness, 1, tournament_size)[0])
+    j: int = int(select_tournament(np.delete(fitness, i), 1,
+                                   tournament_size)[0])
+    return i, j + (j >= i)
+
+
+def steady_state_step(population: Population, batch: int, center: int,
+                      cache: FitnessCache, evaluator=fitness_batch,
+                      offspring: Population = None,
+                      rates: OperatorRates = None,
+                      stats: GenerationStats = None,
+                      unique: bool = True, sharing: float = 0.0,
+                      tournament_size: int = 3) -> Population:
+    """
+
+    :param population: текущая популяция
+    :param batch: количество потомков за шаг
+    :param center: середина хромосомы (индекс)
+    :param cache: кэш значений функции приспособленности
+    :param evaluator: функция вычисления приспособленности массива хромосом
+    :param offspring: буфер размером не менее len(population) + batch + 1
+    (по умолчанию создаётся заново)
+    :param rates: вероятности операторов (см.
+    tools.operator_rates.OperatorRates)
+    :param stats: объект для времени этапов и счётчиков шага
+    :param unique: отбирать ли только особи с различной топологией
+    :param sharing: радиус ниши для разделения приспособленности
+    :param tournament_size: количество особей в турнире выбора родителей
+    :return: популяция после шага, отсортированная по возрастанию
+    функции приспособленности
+
+    Шаг стационарного (steady state) генетического алгоритма: создаётся
+    batch потомков, каждый - скрещиванием или мутацией (оператор
+    выбирается с вероятностью, пропорциональной rates), родители
+    выбираются турнирным отбором. Потомки оцениваются одним вызовом
+    evaluator и вытесняют худших особей популяции. За шаг вычисляется не
+    больше batch значений функции приспособленности вместо примерно
+    3 * len(population) в поколенческом режиме.
+    """
+    if stats is None:
+        stats = GenerationStats()
+    if rates is None:
+        rates = OperatorRates()
+    size: int = len(population)
+    if offspring is None:
+        offspring = Population.empty(size + batch + 1,
+                                     population.genes.shape[1] + 1)
+    sources: np.ndarray = np.empty(len(offspring), dtype=np.intp)
+    offspring.genes[:size] = population.genes
+    offspring.fitness[:size] = population.fitness
+    rows: dict = {'crossover': [], 'mutation': []}
+    failures: dict = {'crossover': 0, 'mutation': 0}
+    # Оба оператора попадают в статистику каждого шага, даже если в этом
+    # шаге не выбирались.
+    stats.declare(*STAGES)
+    # С одной особью скрещивать некого, поэтому остаётся только мутация.
+    share: float = (rates.crossover / (rates.crossover + rates.mutation)
+                    if size > 1 else 0.0)
+    count: int = size
+    for _ in range(4 * batch):
+        if count - size >= batch:
+            break
+        if random.random() < share:
+            with stats.stage('crossover'):
+                i, j = select_parents(population.fitness, tournament_size)
+                children: tuple = crossover(
+                    population.genes[i], population.genes[j], center,
+                    children=(offspring.genes[count],
+                              offspring.genes[count + 1]))
+            better: int = (i if population.fitness[i] <= population.fitness[j]
+                           else j)
+            for child in children:
+                if child is None:
+                    failures['crossover'] += 1
+                    continue
+                offspring.genes[count] = child
+                offspring.fitness[count] = np.nan
+                sources[count] = better
+                rows['crossover'].append(count)
+                count += 1
+        else:
+            with stats.stage('mutation'):
+                i = select_tournament(population.fitness, 1,
+                                      tournament_size)[0]
+                mutant = mutation(population.genes[i], offspring.genes[count])
+            if mutant is None:
+                failures['mutation'] += 1
+                continue
+            offspring.fitness[count] = np.nan
+            sources[count] = i
+            rows['mutation'].append(count)
+            count += 1
+    stats.count('children', len(rows['crossover']))
+    stats.count('crossover_failures', failures['crossover'])
+    stats.count('mutants', len(rows['mutation']))
+    stats.count('mutation_failures', failures['mutation'])
+    current: Population = offspring[:count]
+    with stats.stage('evaluation'):
+        evaluate_population(current, cache, evaluator)
+    update_rates(rates, stats, current, sources, rows)
+    with stats.stage('selection'):
+        chosen, duplicates = survivors(
+            current.fitness, current.genes, size, 'truncation', 1,
+            unique, sharing)
+        np.take(current.genes, chosen, axis=0, out=population.genes)
+        np.take(current.fitness, chosen, out=population.fitness)
+    stats.count('duplicates', duplicates)
+    return population
 
 
 def genetic_algorithm(speciman_size: int, population_size: int,
-                      max_generations: int) -> tuple:
+                      max_generations: int,
+                      cache: FitnessCache = None,
+                      workers: int = 1,
+                      standard: np.ndarray = None,
+                      stopping: StoppingCriteria = None,
+                      selection: str = 'truncation',
+                      elitism: int = 1,
+                      observers: list = (),
+                      checkpoint: Checkpointer = None,
+                      resume: str = None,
+                      memetic: int = 0,
+                      evaluation: str = 'auto',
+                      init: str = 'random',
+                      unique: bool = True,
+                      sharing: float = 0.0,
+                      rates: OperatorRates = None,
+                      steady_state: float = 0.0) -> tuple:
     """
 
     :param speciman_size: количество вершин
     :param population_size: размер популяции
     :param max_generations: максимальное количество поколений
-    :return: Возвращает лучшую особь и статистику
+    :param cache: кэш значений функции приспособленности (по умолчанию
+    создаётся FitnessCache с размером по умолчанию)
+    :param workers: количество процессов для вычисления функции
+    приспособленности (при workers > 1 используется ParallelEvaluator)
+    :param standard: эталонная таблица (см. tools.loader.load_matrix, по
+    умолчанию загружается tools.loader.DEFAULT_MATRIX)
+    :param stopping: критерии досрочной остановки (см. StoppingCriteria)
+    :param selection: способ отбора: 'truncation' (усечённый, по
+    умолчанию), 'tournament', 'rank' или 'roulette'
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :param observers: наблюдатели (см. tools.observer.Observer), которые
+    получают статистику каждого поколения
+    :param checkpoint: периодическая запись контрольных точек (см.
+    tools.checkpoint.Checkpointer)
+    :param resume: путь к контрольной точке, с которой нужно продолжить
+    работу (см. resume_genetic_algorithm)
+    :param memetic: количество лучших особей, которые в каждом поколении
+    улучшаются локальным поиском (см. tools.local_search), 0 - без
+    локального поиска
+    :param evaluation: функция приспособленности популяции: 'auto' (по
+    умолчанию - функция бэкенда tools.backends.get_backend(): numba, если
+    он установлен, иначе fitness_batch), 'batch' (fitness_batch) или
+    'streamed' (fitness_streamed - для больших таблиц, в том числе
+    отображённых в память, требует O(n) памяти на особь)
+    :param init: способ создания начальной популяции: 'random' (по
+    умолчанию) или 'heuristic' (деревья UPGMA, WPGMA, присоединения соседей
+    и их мутанты, см. create_population)
+    :param unique: отбирать ли только особи с различной топологией дерева
+    (копии занимают места, только если различных особей не хватает)
+    :param sharing: радиус ниши (0 < sharing <= 1) для разделения
+    приспособленности по расстоянию Робинсона-Фулдса между деревьями (см.
+    tools.niching), 0 - без разделения
+    :param rates: вероятности скрещивания и мутации, в том числе
+    адаптивные (см. tools.operator_rates.OperatorRates); по умолчанию в
+    поколенческом режиме скрещиваются все пары и мутируют все особи
+    :param steady_state: доля потомков от размера популяции, создаваемых
+    за один шаг стационарного режима (см. steady_state_step); 0 (по
+    умолчанию) - поколенческий режим. В стационарном режиме поколением
+    считается один шаг, а memetic не используется
+    :return: Возвращает хромосому лучшей особи, статистику и причину
+    остановки (константы из tools.stopping)
 
     Генетический алгоритм: скрещивание - мутация - отбор.
 
@@ -25,45 +404,193 @@ def genetic_algorithm(speciman_size: int, population_size: int,
     остальные гены стираются и особь формируется на основе оставшихся
     генов.
 
+    При memetic > 0 алгоритм становится меметическим: после отбора лучшие
+    особи улучшаются локальным поиском ходами NNI.
+
     """
-    population: list = create_population(speciman_size, population_size)
-    fitness_values: list = list(map(fitness_count, population))
-    for individual, fitness_value in zip(population, fitness_values):
-        individual.fitness.values = fitness_value
-    center = speciman_size // 2
-    min_fitness_values = []
-    mean_fitness_values = []
-    generation_counter = 0
-    while generation_counter < max_generations:
-        generation_counter += 1
-
-        random.shuffle(population)
-        offspring_copied = list(map(clone, population))
-        for parent1, parent2 in zip(
-                offspring_copied[::2], offspring_copied[1::2]):
-            result = crossover(parent1, parent2, center)
-            if result[0] is not None:
-                offspring_copied.append(result[0])
-            if result[1] is not None:
-                offspring_copied.append(result[1])
-        for i in range(len(offspring_copied)):
-            mutant = mutation(offspring_copied[i])
-            if mutant is not None:
-                offspring_copied.append(mutant)
-        fresh_fitness_values = list(map(fitness_count, offspring_copied))
-        for individual, fitness_value in zip(
-                offspring_copied, fresh_fitness_values):
-            individual.fitness.values = fitness_value
-        best_offspring = sorted(
-            offspring_copied,
-            key=lambda ind: ind.fitness.values
-        )[:population_size]
-        population = best_offspring[:]
-
-        fitness_values = [ind.fitness.values for ind in population]
-        min_fitness = min(fitness_values)
-        mean_fitness = sum(fitness_values) / len(population)
-        min_fitness_values.append(min_fitness)
-        mean_fitness_values.append(mean_fitness)
-        best_index = fitness_values.index(min(fitness_values))
-    return population[best_index], min_fitness_values, mean_fitness_values
+    if max_generations < 1:
+        raise ValueError(
+            f'Количество поколений должно быть не меньше 1, '
+            f'а не {max_generations}')
+    if cache is None:
+        cache = FitnessCache()
+    if stopping is None:
+        stopping = StoppingCriteria()
+    stopping.start()
+    standard = get_standard(standard)
+    cache.bind(standard)
+    evaluations = 0
+    backend = get_backend()
+    if evaluation == 'auto':
+        function = backend.fitness
+    elif evaluation in FITNESS_FUNCTIONS:
+        function = FITNESS_FUNCTIONS[evaluation]
+    else:
+        raise ValueError(
+            f'Неизвестная функция приспособленности {evaluation!r}, '
+            f'допустимые: auto, {", ".join(FITNESS_FUNCTIONS)}')
+    parallel = (ParallelEvaluator(workers, standard, function=function)
+                if workers > 1
+                else nullcontext(partial(function, standard=standard)))
+    with parallel as evaluator, ExitStack() as cleanup:
+
+        def count_evaluations(chromosomes: np.ndarray) -> np.ndarray:
+            nonlocal evaluations
+            evaluations += len(chromosomes)
+            return evaluator(chromosomes)
+
+        # close наблюдателей вызывается и при ошибке, чтобы не оставались
+        # открытыми их файлы.
+        for observer in reversed(observers):
+            cleanup.callback(observer.close)
+        with_diversity: bool = any(
+            observer.needs_diversity for observer in observers)
+        for observer in observers:
+            observer.start({
+                'speciman_size': speciman_size,
+                'population_size': population_size,
+                'max_generations': max_generations,
+                'workers': workers,
+                'selection': selection,
+                'elitism': elitism,
+                'memetic': memetic,
+                'evaluation': evaluation,
+                'init': init,
+                'unique': unique,
+                'sharing': sharing,
+                'steady_state': steady_state,
+            })
+        min_fitness_values = []
+        mean_fitness_values = []
+        generation_counter = 0
+        if resume is None:
+            population: Population = create_population(
+                speciman_size, population_size, init, standard)
+            evaluate_population(population, cache, count_evaluations)
+        else:
+            state = load_checkpoint(resume)
+            if state['genes'].shape[1:] != (speciman_size - 1, 2):
+                raise ValueError(
+                    f'Контрольная точка {resume} создана для '
+                    f'{len(state["genes"][0]) + 1} вершин, '
+                    f'а не для {speciman_size}')
+            if not all(map(backend.is_valid, state['genes'])):
+                raise ValueError(
+                    f'Контрольная точка {resume} содержит хромосомы с '
+                    f'нарушенной топологией')
+            population = Population(state['genes'], state['fitness'])
+            cache.load_arrays(
+                state['cache_keys'], state['cache_values'],
+                state['cache_digest'].tobytes() if 'cache_digest' in state
+                else None)
+            cache.hits = int(state['cache_hits'])
+            cache.misses = int(state['cache_misses'])
+            min_fitness_values = state['min_fitness_values'].tolist()
+            mean_fitness_values = state['mean_fitness_values'].tolist()
+            generation_counter = int(state['generation'])
+            evaluations = int(state['evaluations'])
+            stopping.started -= float(state['elapsed'])
+            if rates is not None and 'operator_rates' in state:
+                rates.load_arrays(state['operator_rates'],
+                                  state['operator_quality'])
+            if checkpoint is not None:
+                # Контрольная точка resume только что записана, интервал
+                # отсчитывается от неё.
+                checkpoint.saved_generation = generation_counter
+        batch: int = max(1, round(steady_state * population_size))
+        offspring = Population.empty(
+            max(4 * population_size, population_size + batch + 1),
+            speciman_size)
+        center = speciman_size // 2
+        stop_reason = MAX_GENERATIONS
+        while generation_counter < max_generations:
+            generation_counter += 1
+            for observer in observers:
+                observer.before_generation(generation_counter)
+            stats = GenerationStats()
+            started = time.perf_counter()
+            evaluations_before, hits_before = evaluations, cache.hits
+
+            if steady_state > 0:
+                population = steady_state_step(
+                    population, batch, center, cache, count_evaluations,
+                    offspring, rates, stats, unique, sharing)
+            else:
+                population = next_generation(
+                    population, population_size, center, cache,
+                    count_evaluations, offspring, selection, elitism, stats,
+                    partial(local_search, standard=standard), memetic,
+                    unique, sharing, rates)
+
+            if observers:
+                stats.count('evaluations', evaluations - evaluations_before)
+                stats.count('cache_hits', cache.hits - hits_before)
+                record = generation_record(
+                    generation_counter, population, stats,
+                    time.perf_counter() - started, with_diversity)
+                for observer in observers:
+                    observer.generation(record)
+
+            fitness_values = population.fitness
+            min_fitness = fitness_values.min()
+            mean_fitness = fitness_values.mean()
+            min_fitness_values.append(min_fitness)
+            mean_fitness_values.append(mean_fitness)
+            if checkpoint is not None and checkpoint.due(generation_counter):
+                cache_keys, cache_values = cache.to_arrays()
+                operator_state: dict = {}
+                if rates is not None:
+                    operator_rates, operator_quality = rates.to_arrays()
+                    operator_state = {'operator_rates': operator_rates,
+                                      'operator_quality': operator_quality}
+                checkpoint.save(
+                    generation_counter,
+                    genes=population.genes,
+                    fitness=population.fitness,
+                    min_fitness_values=min_fitness_values,
+                    mean_fitness_values=mean_fitness_values,
+                    evaluations=evaluations,
+                    elapsed=time.monotonic() - stopping.started,
+                    cache_keys=cache_keys,
+                    cache_values=cache_values,
+                    cache_hits=cache.hits,
+                    cache_misses=cache.misses,
+                    cache_digest=np.frombuffer(cache.digest, dtype=np.uint8),
+                    **operator_state,
+                )
+            reason = stopping.check(min_fitness_values, evaluations)
+            if reason is not None:
+                stop_reason = reason
+                break
+        best_index = population.fitness.argmin()
+        for observer in observers:
+            observer.finish({
+                'generations': generation_counter,
+                'best': float(population.fitness[best_index]),
+                'evaluations': evaluations,
+                'stop_reason': stop_reason,
+            })
+        return (population[best_index].copy(), min_fitness_values,
+                mean_fitness_values, stop_reason)
+
+
+def resume_genetic_algorithm(path: str, max_generations: int,
+                             **kwargs) -> tuple:
+    """
+
+    :param path: путь к контрольной точке (см. tools.checkpoint)
+    :param max_generations: максимальное количество поколений с учётом
+    поколений, выполненных до контрольной точки
+    :param kwargs: остальные параметры genetic_algorithm
+    :return: результат genetic_algorithm
+
+    Продолжает работу генетического алгоритма с контрольной точки:
+    популяция, статистика, кэш, состояние rates (адаптивные вероятности
+    операторов) и состояния генераторов случайных чисел
+    восстанавливаются, поэтому при тех же параметрах результат совпадает
+    с результатом непрерывного запуска.
+    """
+    with np.load(path) as data:
+        population_size, chromosome_size = data['genes'].shape[:2]
+    return genetic_algorithm(chromosome_size + 1, population_size,
+                             max_generations, resume=path, **kwargs)
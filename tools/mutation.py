@@ -1,14 +1,18 @@
 from random import randint
 
-from tools.population_creator import (ImpossibleToCompleteError, Individual,
+import numpy as np
+
+from tools.population_creator import (EMPTY, ImpossibleToCompleteError,
                                       create_individual)
 
 
-def mutation(individual: Individual):
+def mutation(individual: np.ndarray, mutant: np.ndarray = None):
     """
 
-    :param individual: особь
-    :return: возвращает мутировавшую особь
+    :param individual: хромосома особи
+    :param mutant: массив, в который записывается хромосома мутанта
+    (необязательно)
+    :return: возвращает хромосому мутировавшей особи или None
 
     Для мутации хромосомы сначала с помощью генератора случайных чисел
     выбирается количество генов, которые не будут подвержены мутации.
@@ -22,7 +26,9 @@ def mutation(individual: Individual):
     полной хромосомы.
     """
     length: int = len(individual)
-    template: list = [None] * length
+    template: np.ndarray = (np.empty_like(individual)
+                            if mutant is None else mutant)
+    template.fill(EMPTY)
     no_change_amount = range(randint(int(length * 0.5), int(length * 0.9)))
     no_change_index = []
     for _ in no_change_amount:
@@ -35,7 +41,6 @@ def mutation(individual: Individual):
     for i in no_change_index:
         template[i] = individual[i]
     try:
-        mutant = create_individual(length + 1, template=template)
+        return create_individual(length + 1, template=template)
     except ImpossibleToCompleteError:
-        mutant = None
-    return mutant
+        return None
@@ -0,0 +1,129 @@
+import numpy as np
+
+from tools.fitness import merge_averages
+
+
+class TreeNode:
+    """
+    Вершина филогенетического дерева.
+
+    leaf - номер простейшей вершины (None для внутренних вершин), children -
+    список дочерних вершин (пустой у простейших вершин), height - высота
+    вершины: 0 у простейших вершин, (1 - d(A, B)) / 2 у вершины, образованной
+    геном с вершинами A и B и средней мерой близости d(A, B) между ними.
+    support - поддержка внутренней вершины (например, частота клады в
+    консенсусном дереве), записывается в Newick после закрывающей скобки.
+    """
+
+    __slots__ = ('leaf', 'children', 'height', 'support')
+
+    def __init__(self, leaf: int = None, children: list = None,
+                 height: float = 0.0, support: float = None):
+        self.leaf = leaf
+        self.children = [] if children is None else children
+        self.height = height
+        self.support = support
+
+
+def chromosome_to_tree(chromosome: np.ndarray,
+                       standard: np.ndarray = None,
+                       heights: bool = False) -> TreeNode:
+    """
+
+    :param chromosome: хромосома особи
+    :param standard: эталонная таблица (нужна только при heights=True)
+    :param heights: вычислять ли высоты вершин по средним мерам близости
+    :return: корень дерева
+
+    Для каждой вершины хромосомы хранится соответствующая ей вершина
+    дерева, поэтому каждый ген обрабатывается за O(1), а всё дерево
+    строится за O(n). Высоты вычисляются функцией merge_averages за O(n)
+    памяти.
+    """
+    genes: list = np.asarray(chromosome).tolist()
+    n: int = len(genes) + 1
+    averages: list = (merge_averages(chromosome, standard).tolist()
+                      if heights and genes else [1.0] * len(genes))
+    current: list = [TreeNode(leaf) for leaf in range(n)]
+    for (node_1, node_2), average in zip(genes, averages):
+        current[node_1] = TreeNode(
+            children=[current[node_1], current[node_2]],
+            height=(1 - average) / 2)
+    return current[genes[-1][0] if genes else 0]
+
+
+def to_newick(root: TreeNode, names: list = None,
+              lengths: bool = False) -> str:
+    """
+
+    :param root: корень дерева
+    :param names: имена простейших вершин (по умолчанию их номера)
+    :param lengths: записывать ли длины ветвей (разность высот родительской
+    и дочерней вершины; отрицательные длины заменяются нулём)
+    :return: дерево в формате Newick
+
+    Обход выполняется без рекурсии, поэтому глубина дерева не ограничена
+    пределом рекурсии Python.
+    """
+    parts: list = []
+    stack: list = [(root, root.height)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+            continue
+        node, parent_height = item
+        suffix: str = (f':{max(parent_height - node.height, 0.0):.6g}'
+                       if lengths and node is not root else '')
+        if not node.children:
+            name = node.leaf if names is None else names[node.leaf]
+            parts.append(f'{name}{suffix}')
+            continue
+        parts.append('(')
+        support: str = ('' if node.support is None
+                        else f'{node.support:.6g}')
+        stack.append(f'){support}{suffix}')
+        for i, child in enumerate(reversed(node.children)):
+            if i:
+                stack.append(',')
+            stack.append((child, node.height))
+    return ''.join(parts) + ';'
+
+
+class NewickWriter:
+    """
+    Потоковая запись деревьев в файл Newick, по дереву на строку.
+
+    Каждое дерево строится, записывается и сразу освобождается, поэтому
+    память не зависит от количества деревьев. Используется как контекстный
+    менеджер или вызовом close().
+    """
+
+    def __init__(self, path: str, names: list = None,
+                 standard: np.ndarray = None, lengths: bool = False):
+        self.names = names
+        self.standard = standard
+        self.lengths = lengths
+        self.file = open(path, 'w')
+
+    def write(self, chromosome: np.ndarray) -> None:
+        root: TreeNode = chromosome_to_tree(
+            chromosome, self.standard, heights=self.lengths)
+        self.file.write(to_newick(root, self.names, self.lengths) + '\n')
+
+    def write_all(self, chromosomes) -> None:
+        """
+
+        :param chromosomes: итерируемый набор хромосом (например, генератор)
+        """
+        for chromosome in chromosomes:
+            self.write(chromosome)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,222 @@
+import numpy as np
+
+from tools.cache import canonical_key
+from tools.selection import select, select_best, select_distinct
+
+
+def unique_individuals(genes: np.ndarray,
+                       fitness: np.ndarray = None) -> np.ndarray:
+    """
+
+    :param genes: массив хромосом
+    :param fitness: значения функции приспособленности (необязательно)
+    :return: маска особей, топология которых встречается впервые
+
+    Особи с одинаковым каноническим ключом (tools.cache.canonical_key)
+    описывают одно дерево, из них в маску попадает первая.
+
+    Значение функции приспособленности дерева берётся из кэша по тому же
+    ключу, поэтому копии имеют одинаковые значения. Если fitness задан,
+    ключи вычисляются только для особей, значение которых встречается
+    больше одного раза, - остальные особи заведомо различны.
+    """
+    seen: set = set()
+    mask: np.ndarray = np.zeros(len(genes), dtype=bool)
+    candidates = range(len(genes))
+    if fitness is not None:
+        _, inverse, counts = np.unique(fitness, return_inverse=True,
+                                       return_counts=True)
+        repeated: np.ndarray = counts[inverse.ravel()] > 1
+        mask[~repeated] = True
+        candidates = np.flatnonzero(repeated)
+    for i in candidates:
+        key: bytes = canonical_key(genes[i])
+        if key not in seen:
+            seen.add(key)
+            mask[i] = True
+    return mask
+
+
+# Клады, которые есть больше чем у DENSE_CLADE особей, учитываются
+# умножением матриц принадлежности, остальные - перебором пар особей.
+DENSE_CLADE = 32
+
+# Ограничение на число элементов во временных массивах tree_distances.
+DISTANCE_ELEMENTS = 2 ** 22
+
+
+def clade_columns(genes: np.ndarray) -> tuple:
+    """
+
+    :param genes: массив хромосом
+    :return: номера клад особей формы (особи, n - 2) и количество особей с
+    каждой кладой
+
+    Клада - множество простейших вершин внутренней вершины дерева, кроме
+    корня (см. tools.cache.cluster_masks). Вместо битовой маски клада
+    представляется 64-битной суммой случайных ключей её простейших вершин:
+    при объединении вершин суммы складываются, поэтому ключи всех клад
+    популяции вычисляются за n - 2 векторных операции над всей популяцией.
+    Ключи фиксированы для каждого n и не используют генераторы случайных
+    чисел алгоритма. Вероятность совпадения сумм различных клад - порядка
+    2 ** -64 для пары клад.
+
+    Маски cluster_masks здесь не используются: каждая маска - n-битное
+    целое, и нумерация клад всей популяции словарём масок стоит
+    O(N * n ** 2) операций (при N = 1000, n = 500 - около 1.5 с против
+    0.15 с для сумм ключей). Суммы ключей нужны только для подсчёта общих
+    клад внутри одной популяции и нигде не хранятся, а canonical_key,
+    по которому кэш и отбор различают деревья, строится по точным маскам.
+    """
+    size: int = len(genes)
+    n: int = genes.shape[1] + 1
+    keys: np.ndarray = np.random.default_rng(n).integers(
+        np.iinfo(np.uint64).max, dtype=np.uint64, endpoint=True, size=n)
+    sums: np.ndarray = np.tile(keys, (size, 1))
+    clades: np.ndarray = np.empty((size, max(n - 2, 0)), dtype=np.uint64)
+    rows: np.ndarray = np.arange(size)
+    for k in range(n - 2):
+        node_1, node_2 = genes[:, k, 0], genes[:, k, 1]
+        merged: np.ndarray = sums[rows, node_1] + sums[rows, node_2]
+        sums[rows, np.minimum(node_1, node_2)] = merged
+        clades[:, k] = merged
+    _, columns, counts = np.unique(clades, return_inverse=True,
+                                   return_counts=True)
+    return columns.reshape(clades.shape), counts
+
+
+def tree_distances(genes: np.ndarray) -> np.ndarray:
+    """
+
+    :param genes: массив хромосом
+    :return: таблица попарных расстояний между деревьями особей
+
+    Расстояние Робинсона-Фулдса: доля клад одного дерева (см.
+    clade_columns), которых нет в другом. 0 - одинаковые деревья, 1 -
+    деревья без общих клад.
+
+    Количества общих клад пар деревьев складываются только по кладам,
+    которые есть хотя бы у двух особей. Клады, которые есть у многих
+    особей, обрабатываются умножением матриц принадлежности по блокам
+    столбцов, остальные - перебором пар особей с каждой кладой (работа
+    пропорциональна сумме квадратов количеств особей с кладой). Временные
+    массивы не превышают DISTANCE_ELEMENTS элементов.
+    """
+    size: int = len(genes)
+    clades: int = genes.shape[1] - 1 if size else 0
+    if clades <= 0:
+        return np.zeros((size, size))
+    columns, counts = clade_columns(genes)
+    rows: np.ndarray = np.repeat(np.arange(size), clades)
+    columns = columns.ravel()
+    shared: np.ndarray = counts[columns] > 1
+    rows, columns = rows[shared], columns[shared]
+    common: np.ndarray = np.zeros((size, size))
+    dense: np.ndarray = counts[columns] > DENSE_CLADE
+    numbers, inverse = np.unique(columns[dense], return_inverse=True)
+    block: int = max(1, DISTANCE_ELEMENTS // size)
+    for start in range(0, len(numbers), block):
+        inside: np.ndarray = (start <= inverse) & (inverse < start + block)
+        membership: np.ndarray = np.zeros(
+            (size, min(block, len(numbers) - start)), dtype=np.float32)
+        membership[rows[dense][inside], inverse[inside] - start] = 1
+        common += membership @ membership.T
+    rows, columns = rows[~dense], columns[~dense]
+    order: np.ndarray = np.argsort(columns, kind='stable')
+    rows, columns = rows[order], columns[order]
+    amounts: np.ndarray = counts[columns]
+    for amount in np.unique(amounts):
+        members: np.ndarray = rows[amounts == amount].reshape(-1, amount)
+        step: int = max(1, DISTANCE_ELEMENTS // (amount * amount))
+        for start in range(0, len(members), step):
+            group: np.ndarray = members[start:start + step]
+            pairs: np.ndarray = group[:, :, None] * size + group[:, None, :]
+            common.ravel()[:] += np.bincount(pairs.ravel(),
+                                             minlength=size * size)
+    np.fill_diagonal(common, clades)
+    return 1 - common / clades
+
+
+def mean_distance(genes: np.ndarray) -> float:
+    """
+
+    :param genes: массив хромосом
+    :return: среднее расстояние (см. tree_distances) между деревьями
+    различных особей, 0 для популяции из одной особи
+
+    Клада, которая есть у c особей, общая для c * (c - 1) упорядоченных
+    пар различных особей, поэтому среднее вычисляется по количествам
+    особей с каждой кладой за O(n) операций на особь, без таблицы
+    попарных расстояний.
+    """
+    size: int = len(genes)
+    clades: int = genes.shape[1] - 1 if size else 0
+    if size < 2 or clades <= 0:
+        return 0.0
+    _, counts = clade_columns(genes)
+    common: float = float(np.dot(counts, counts - 1))
+    return 1 - common / (size * (size - 1) * clades)
+
+
+def shared_fitness(fitness: np.ndarray, genes: np.ndarray,
+                   radius: float) -> np.ndarray:
+    """
+
+    :param fitness: значения функции приспособленности
+    :param genes: массив хромосом
+    :param radius: радиус ниши (0 < radius <= 1)
+    :return: значения функции приспособленности с учётом разделения
+
+    Разделение приспособленности (fitness sharing): значение каждой особи
+    умножается на число особей в её нише, sum(max(0, 1 - d / radius)) по
+    всем особям, включая её саму, где d - расстояние tree_distances.
+    Приспособленность минимизируется, поэтому особи из густонаселённых
+    ниш проигрывают при отборе особям с редкой топологией.
+    """
+    niches: np.ndarray = np.clip(
+        1 - tree_distances(genes) / radius, 0, None).sum(axis=1)
+    return fitness * niches
+
+
+def survivors(fitness: np.ndarray, genes: np.ndarray, amount: int,
+              method: str = 'truncation', elitism: int = 1,
+              unique: bool = True, sharing: float = 0.0) -> tuple:
+    """
+
+    :param fitness: значения функции приспособленности
+    :param genes: массив хромосом
+    :param amount: количество отбираемых особей
+    :param method: способ отбора (см. tools.selection.SELECTIONS)
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :param unique: отбирать ли только особи с различной топологией
+    :param sharing: радиус ниши для разделения приспособленности (см.
+    shared_fitness), 0 - без разделения
+    :return: индексы отобранных особей по возрастанию приспособленности и
+    количество копий среди особей
+
+    При unique=True каждая особь отбирается не больше одного раза при
+    любом способе отбора (см. tools.selection.select_distinct). Если
+    различных особей меньше amount, недостающие места занимают лучшие из
+    копий. При разделении приспособленности лучшая особь
+    проходит отбор всегда.
+    """
+    candidates: np.ndarray = np.arange(len(fitness))
+    duplicates: np.ndarray = candidates[:0]
+    if unique:
+        mask: np.ndarray = unique_individuals(genes, fitness)
+        candidates, duplicates = candidates[mask], candidates[~mask]
+    values: np.ndarray = fitness[candidates]
+    if sharing > 0:
+        values = shared_fitness(values, genes[candidates], sharing)
+    choose = select_distinct if unique else select
+    chosen: np.ndarray = candidates[choose(
+        values, min(amount, len(candidates)), method, elitism)]
+    best: int = candidates[fitness[candidates].argmin()]
+    if sharing > 0 and len(chosen) and best not in chosen:
+        chosen[-1] = best
+    if len(chosen) < amount:
+        chosen = np.concatenate([chosen, duplicates[select_best(
+            fitness[duplicates], amount - len(chosen))]])
+    if unique or sharing > 0:
+        chosen = chosen[np.argsort(fitness[chosen], kind='stable')]
+    return chosen, len(duplicates)
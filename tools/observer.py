@@ -0,0 +1,232 @@
+import cProfile
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from tools.cache import canonical_key
+from tools.niching import mean_distance
+
+
+# Этапы поколения, время которых есть в статистике каждого поколения
+# (GenerationStats.declare).
+STAGES = ('crossover', 'mutation', 'evaluation', 'selection')
+
+# Ключи словаря статистики поколения (generation_record) в порядке
+# столбцов CSV. Счётчики и время этапов, которых не было в поколении,
+# отсутствуют в словаре.
+RECORD_FIELDS = (
+    'generation', 'best', 'mean', 'diversity', 'distance',
+    'children', 'crossover_failures', 'crossover_successes',
+    'mutants', 'mutation_failures', 'mutation_successes',
+    'duplicates', 'improved', 'evaluations', 'cache_hits',
+    'time_crossover', 'time_mutation', 'time_evaluation',
+    'time_selection', 'time_local_search', 'time_total',
+)
+
+
+class GenerationStats:
+    """
+    Время этапов и счётчики одного поколения генетического алгоритма.
+
+    timings - суммарное время этапов в секундах (crossover, mutation,
+    evaluation, selection), counters - счётчики событий (children,
+    crossover_failures, mutants, mutation_failures, duplicates, а при
+    заданных вероятностях операторов - crossover_successes и
+    mutation_successes). Счётчики вычислений
+    функции приспособленности и попаданий в кэш заполняет
+    genetic_algorithm.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Добавляет время выполнения блока with к этапу name."""
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = (self.timings.get(name, 0.0)
+                                  + time.perf_counter() - start)
+
+    def declare(self, *names: str) -> None:
+        """
+        Добавляет этапы names с нулевым временем, чтобы они попадали в
+        статистику, даже если в поколении не выполнялись.
+        """
+        for name in names:
+            self.timings.setdefault(name, 0.0)
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + value
+
+
+def diversity(population) -> float:
+    """
+
+    :param population: популяция
+    :return: доля особей с различной топологией дерева
+
+    Особи с одинаковым каноническим ключом (tools.cache.canonical_key)
+    описывают одно дерево, поэтому 1.0 означает, что все деревья популяции
+    разные, а 1 / len(population) - что популяция состоит из копий одного
+    дерева.
+    """
+    keys: set = {canonical_key(genes) for genes in population.genes}
+    return len(keys) / len(population)
+
+
+class Observer:
+    """
+    Наблюдатель за работой генетического алгоритма.
+
+    genetic_algorithm вызывает методы наблюдателя:
+        1. start - перед созданием начальной популяции, с параметрами
+        запуска;
+
+        2. before_generation - перед каждым поколением, с его номером;
+
+        3. generation - после каждого поколения, со словарём статистики
+        поколения (номер, лучшая и средняя приспособленность, счётчики и
+        время этапов, а если хотя бы у одного наблюдателя needs_diversity
+        - ещё и разнообразие);
+
+        4. finish - после остановки, со словарём итогов запуска;
+
+        5. close - в конце работы, в том числе после ошибки, для
+        освобождения ресурсов (файлов и т. п.).
+
+    Методы базового класса ничего не делают, наследники переопределяют
+    только нужные.
+
+    Разнообразие популяции (diversity и distance) требует хеширования всех
+    деревьев популяции в каждом поколении, поэтому вычисляется, только
+    если оно нужно хотя бы одному наблюдателю (needs_diversity = True).
+    """
+
+    needs_diversity: bool = False
+
+    def start(self, parameters: dict) -> None:
+        pass
+
+    def before_generation(self, generation: int) -> None:
+        pass
+
+    def generation(self, record: dict) -> None:
+        pass
+
+    def finish(self, summary: dict) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class StatsWriter(Observer):
+    """
+    Записывает статистику поколений в файл JSONL (по строке JSON на
+    поколение) или CSV - формат определяется по расширению файла.
+
+    Файл открывается в start и закрывается в close; запись буферизуется,
+    поэтому наблюдатель почти не замедляет алгоритм.
+
+    Столбцы CSV - RECORD_FIELDS. Значения, которых нет в записи, остаются
+    пустыми, а ключ записи не из RECORD_FIELDS - ошибка ValueError, а не
+    молча пропущенный столбец.
+    """
+
+    needs_diversity = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.csv = os.path.splitext(path)[1].lower() == '.csv'
+        self.file = None
+        self.writer = None
+
+    def start(self, parameters: dict) -> None:
+        self.file = open(self.path, 'w', newline='')
+        self.writer = None
+
+    def generation(self, record: dict) -> None:
+        if not self.csv:
+            self.file.write(json.dumps(record) + '\n')
+            return
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=RECORD_FIELDS)
+            self.writer.writeheader()
+        self.writer.writerow(record)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class GenerationProfiler(Observer):
+    """
+    Профилирует выбранные поколения с помощью cProfile.
+
+    Профилируется каждое every-е поколение, но не больше samples поколений.
+    Статистика поколения сохраняется в файл f'{prefix}{номер}.prof', который
+    можно открыть модулем pstats или snakeviz.
+    """
+
+    def __init__(self, prefix: str = 'generation_', every: int = 100,
+                 samples: int = 5):
+        self.prefix = prefix
+        self.every = every
+        self.samples = samples
+        self.profiled = 0
+        self.profile = None
+
+    def before_generation(self, generation: int) -> None:
+        if self.profiled < self.samples and generation % self.every == 0:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def generation(self, record: dict) -> None:
+        if self.profile is None:
+            return
+        self.profile.disable()
+        self.profile.dump_stats(f'{self.prefix}{record["generation"]}.prof')
+        self.profile = None
+        self.profiled += 1
+
+    def close(self) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile = None
+
+
+def generation_record(generation: int, population, stats: GenerationStats,
+                      elapsed: float, with_diversity: bool = True) -> dict:
+    """
+
+    :param generation: номер поколения
+    :param population: популяция после отбора
+    :param stats: время этапов и счётчики поколения
+    :param elapsed: время поколения в секундах
+    :param with_diversity: вычислять ли разнообразие популяции (diversity
+    и distance)
+    :return: словарь статистики поколения для наблюдателей
+    """
+    fitness: np.ndarray = population.fitness
+    record: dict = {
+        'generation': generation,
+        'best': float(fitness.min()),
+        'mean': float(fitness.mean()),
+    }
+    if with_diversity:
+        record['diversity'] = diversity(population)
+        record['distance'] = mean_distance(population.genes)
+    record.update(stats.counters)
+    record.update(
+        (f'time_{name}', seconds) for name, seconds in stats.timings.items())
+    record['time_total'] = elapsed
+    return record
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Операторы генетического алгоритма, вероятности которых настраиваются.
+OPERATORS = ('crossover', 'mutation')
+
+
+class OperatorRates:
+    """
+    Вероятности применения скрещивания и мутации.
+
+    В поколенческом режиме crossover - вероятность скрещивания пары
+    родителей, mutation - вероятность мутации каждой особи. В
+    стационарном режиме (steady state) каждый потомок создаётся одним
+    оператором, который выбирается с вероятностью, пропорциональной его
+    значению.
+
+    При adaptive=True вероятности подстраиваются после каждого поколения
+    (probability matching): для каждого оператора хранится скользящее
+    среднее доли успешных потомков (потомок успешен, если он лучше
+    лучшего из родителей) с весом memory для прошлых значений, и общая
+    сумма вероятностей распределяется пропорционально этим долям. Ни одна
+    вероятность не опускается ниже minimum и не превышает 1, поэтому
+    временно бесполезный оператор продолжает проверяться.
+    """
+
+    def __init__(self, crossover: float = 1.0, mutation: float = 1.0,
+                 adaptive: bool = False, minimum: float = 0.25,
+                 memory: float = 0.8):
+        for name, rate in zip(OPERATORS, (crossover, mutation)):
+            if not 0 <= rate <= 1:
+                raise ValueError(
+                    f'Вероятность {name} должна лежать в [0, 1], '
+                    f'а не {rate}')
+        if crossover + mutation <= 0:
+            raise ValueError('Хотя бы одна вероятность должна быть больше 0')
+        self.rates = {'crossover': crossover, 'mutation': mutation}
+        self.adaptive = adaptive
+        self.minimum = minimum
+        self.memory = memory
+        self.total = crossover + mutation
+        self.quality = {name: None for name in OPERATORS}
+
+    @property
+    def crossover(self) -> float:
+        return self.rates['crossover']
+
+    @property
+    def mutation(self) -> float:
+        return self.rates['mutation']
+
+    def update(self, successes: dict, attempts: dict) -> None:
+        """
+
+        :param successes: количество успешных потомков каждого оператора
+        :param attempts: количество потомков каждого оператора
+
+        Обновляет доли успешных потомков и, при adaptive=True,
+        вероятности операторов. Оператор без потомков в этом поколении
+        сохраняет прежнюю долю.
+        """
+        for name in OPERATORS:
+            if not attempts.get(name):
+                continue
+            share: float = successes.get(name, 0) / attempts[name]
+            previous = self.quality[name]
+            self.quality[name] = (share if previous is None else
+                                  self.memory * previous
+                                  + (1 - self.memory) * share)
+        if not self.adaptive or None in self.quality.values():
+            return
+        weights: float = sum(self.quality.values())
+        for name in OPERATORS:
+            share: float = (self.quality[name] / weights if weights > 0
+                            else 1 / len(OPERATORS))
+            self.rates[name] = min(max(self.total * share, self.minimum), 1.0)
+
+    def to_arrays(self) -> tuple:
+        """
+
+        :return: вероятности и доли успешных потомков операторов в порядке
+        OPERATORS (nan - доля ещё неизвестна) для контрольной точки
+        """
+        return (np.array([self.rates[name] for name in OPERATORS]),
+                np.array([np.nan if self.quality[name] is None
+                          else self.quality[name] for name in OPERATORS]))
+
+    def load_arrays(self, rates: np.ndarray, quality: np.ndarray) -> None:
+        """
+
+        :param rates: вероятности операторов (см. to_arrays)
+        :param quality: доли успешных потомков операторов
+        """
+        for name, rate, share in zip(OPERATORS, rates.tolist(),
+                                     quality.tolist()):
+            self.rates[name] = rate
+            self.quality[name] = None if np.isnan(share) else share
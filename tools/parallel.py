@@ -0,0 +1,149 @@
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from tools.fitness import BATCH_ELEMENTS, fitness_batch, get_standard
+
+# Эталонная таблица и разделяемая память, к которой подключился процесс пула.
+_worker_memory = None
+_worker_standard = None
+
+
+def attach_standard(name: str, shape: tuple, dtype: str,
+                    filename: str = None, offset: int = 0,
+                    order: str = 'C') -> None:
+    """
+
+    :param name: имя блока разделяемой памяти (None, если задан filename)
+    :param shape: размерность эталонной таблицы
+    :param dtype: тип элементов эталонной таблицы
+    :param filename: файл, отображённый в память, в котором хранится
+    эталонная таблица
+    :param offset: смещение таблицы в файле filename
+    :param order: порядок хранения таблицы в файле ('C' или 'F')
+
+    Инициализатор процесса пула. Подключается к разделяемой памяти, в
+    которую главный процесс один раз записал эталонную таблицу, или
+    отображает в память тот же файл, что и главный процесс, и сохраняет
+    представление таблицы в виде массива numpy (без копирования).
+    """
+    global _worker_memory, _worker_standard
+    if filename is not None:
+        _worker_standard = np.memmap(filename, dtype=dtype, mode='r',
+                                     offset=offset, shape=shape,
+                                     order=order)
+        return
+    _worker_memory = SharedMemory(name=name)
+    _worker_standard = np.ndarray(shape, dtype=dtype,
+                                  buffer=_worker_memory.buf)
+
+
+def mapped_file(standard: np.ndarray) -> tuple:
+    """
+
+    :param standard: эталонная таблица
+    :return: имя файла, смещение и порядок хранения ('C' или 'F'), если
+    таблица - файл, целиком отображённый в память (np.load с mmap_mode),
+    иначе (None, 0, 'C')
+    """
+    if (isinstance(standard, np.memmap) and standard.filename is not None
+            and isinstance(standard.base, mmap.mmap)):
+        if standard.flags.c_contiguous:
+            return standard.filename, standard.offset, 'C'
+        if standard.flags.f_contiguous:
+            return standard.filename, standard.offset, 'F'
+    return None, 0, 'C'
+
+
+def evaluate_chunk(chromosomes: np.ndarray,
+                   function=fitness_batch) -> np.ndarray:
+    """
+
+    :param chromosomes: группа хромосом формы (особи, n - 1, 2)
+    :param function: функция приспособленности популяции (fitness_batch
+    или fitness_streamed)
+    :return: значения функции приспособленности этих особей
+    """
+    return function(chromosomes, standard=_worker_standard)
+
+
+class ParallelEvaluator:
+    """
+    Вычисление функции приспособленности в пуле процессов.
+
+    Эталонная таблица публикуется в разделяемой памяти один раз при создании
+    пула; таблица, отображённая в память из файла .npy, не копируется -
+    процессы пула отображают тот же файл. Копирование в разделяемую память
+    выполняется блоками строк. Популяция разбивается на группы хромосом
+    (chunk_size особей), и каждая группа отправляется в процесс пула
+    целиком в виде массива int32, так что накладные расходы на передачу
+    данных невелики. Группа оценивается функцией function (fitness_batch
+    или fitness_streamed).
+
+    Порядок результатов совпадает с порядком особей, а сами значения не
+    зависят от числа процессов, поэтому при фиксированном seed
+    генетический алгоритм даёт те же результаты, что и без пула.
+
+    Процессы пула создаются методом spawn: ядро numba с parallel=True
+    (tools.backends) запускает потоки, и процесс, созданный fork после
+    их запуска, может зависнуть. Поэтому скрипт, создающий пул, должен
+    запускать алгоритм под if __name__ == '__main__'.
+
+    Используется как контекстный менеджер или вызовом close().
+    """
+
+    def __init__(self, workers: int, standard: np.ndarray = None,
+                 chunk_size: int = 32, function=fitness_batch):
+        standard = get_standard(standard)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.function = function
+        self._memory = None
+        filename, offset, order = mapped_file(standard)
+        if filename is None:
+            self._memory = SharedMemory(create=True,
+                                        size=max(1, standard.nbytes))
+            shared = np.ndarray(standard.shape, dtype=standard.dtype,
+                                buffer=self._memory.buf)
+            rows: int = max(1, BATCH_ELEMENTS // max(1, standard.shape[-1]))
+            for start in range(0, len(standard), rows):
+                shared[start:start + rows] = standard[start:start + rows]
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context('spawn'),
+            initializer=attach_standard,
+            initargs=(self._memory and self._memory.name, standard.shape,
+                      standard.dtype.str, filename, offset, order),
+        )
+
+    def __call__(self, population: list) -> np.ndarray:
+        """
+
+        :param population: популяция (список особей или массив хромосом)
+        :return: массив значений функции приспособленности всех особей
+        """
+        chromosomes: np.ndarray = np.asarray(population, dtype=np.int32)
+        if not len(chromosomes):
+            return np.empty(0)
+        chunks: list = [
+            chromosomes[start:start + self.chunk_size]
+            for start in range(0, len(chromosomes), self.chunk_size)
+        ]
+        return np.concatenate(list(self._executor.map(
+            partial(evaluate_chunk, function=self.function), chunks)))
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
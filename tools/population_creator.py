@@ -1,53 +1,153 @@
-from numpy import arange, random
-from numpy.ma import masked_array as m_arr
-from numpy.ma import masked_values
+from bisect import bisect_left
+
+import numpy as np
+from numpy import random
+
+# Значение, которым в шаблоне хромосомы отмечаются незаполненные гены.
+EMPTY = -1
 
 
 class ImpossibleToCompleteError(ValueError):
     pass
 
 
-class Fitness:
-    def __init__(self):
-        self.values = [0]
+class Population:
+    """
+    Популяция, хранящаяся в непрерывных массивах.
+
+    genes - массив int32 формы (особи, n - 1, 2): хромосомы всех особей;
+    fitness - массив float64 значений функции приспособленности. Значение
+    nan означает, что приспособленность особи ещё не вычислена.
+
+    Индексирование целым числом возвращает хромосому особи как
+    представление (view) строки массива genes. Срез возвращает новую
+    популяцию, разделяющую память с исходной, поэтому клонирование
+    популяции срезом не копирует данные.
+    """
+
+    def __init__(self, genes: np.ndarray, fitness: np.ndarray = None):
+        self.genes = genes
+        if fitness is None:
+            fitness = np.full(len(genes), np.nan)
+        self.fitness = fitness
+
+    @classmethod
+    def empty(cls, size: int, n: int):
+        """
 
+        :param size: количество особей
+        :param n: количество вершин бинарного дерева
+        :return: популяция с незаполненными хромосомами
+        """
+        return cls(np.full((size, n - 1, 2), EMPTY, dtype=np.int32))
 
-class Individual(list):
-    def __init__(self, *args):
-        super().__init__(*args)
-        self.fitness = Fitness()
+    def __len__(self) -> int:
+        return len(self.genes)
 
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.genes[index]
+        return Population(self.genes[index], self.fitness[index])
 
-def is_chromosome_valid(chromosome: list) -> bool:
+    @property
+    def valid(self) -> np.ndarray:
+        """Маска особей, для которых известна функция приспособленности."""
+        return ~np.isnan(self.fitness)
+
+    def copy(self):
+        return Population(self.genes.copy(), self.fitness.copy())
+
+
+class TopologyIndex:
     """
+    Индекс топологии шаблона хромосомы.
 
-    :param chromosome: хромосома (или её шаблон)
-    :return: True/False для верной/нарушенной топологии хромосомы
+    Для каждой вершины хранится номер гена, в котором она стоит на второй
+    позиции (second), и номер последнего гена, в котором она стоит на первой
+    позиции (last). Если вершина в таких генах не встречается, хранится
+    EMPTY.
+
+    Индекс позволяет за O(1) ответить, можно ли поставить ген в шаблон, не
+    нарушив топологию (см. is_chromosome_valid), и обновляется при
+    добавлении каждого гена.
     """
-    for i, gen in enumerate(chromosome):
-        for j in chromosome[:i:-1]:
-            if gen and j and gen[1] in j:
-                return False
-    return True
 
+    def __init__(self, n: int):
+        self.second = [EMPTY] * n
+        self.last = [EMPTY] * n
+
+    @classmethod
+    def from_template(cls, template: np.ndarray):
+        """
+
+        :param template: шаблон хромосомы
+        :return: индекс топологии этого шаблона
+        """
+        index = cls(len(template) + 1)
+        for i, gen in enumerate(template.tolist()):
+            if gen[1] != EMPTY:
+                index.place(gen, i)
+        return index
 
-def get_nodes(first_place: m_arr, second_place: m_arr) -> tuple:
+    def can_place(self, gen: list, i: int) -> bool:
+        """
+
+        :param gen: ген (node_1, node_2)
+        :param i: номер гена в хромосоме
+        :return: можно ли поставить ген на место i
+
+        Вершина node_2 не должна стоять на второй позиции в других генах и
+        не должна встречаться на первой позиции после гена i. Вершина node_1
+        может стоять на второй позиции только в одном из последующих генов.
+        """
+        node_1, node_2 = gen
+        second: int = self.second[node_1]
+        return (self.second[node_2] == EMPTY and self.last[node_2] < i
+                and (second == EMPTY or second > i))
+
+    def place(self, gen: list, i: int) -> None:
+        """
+
+        :param gen: ген (node_1, node_2)
+        :param i: номер гена в хромосоме
+        """
+        node_1, node_2 = gen
+        self.second[node_2] = i
+        if self.last[node_1] < i:
+            self.last[node_1] = i
+
+
+def is_chromosome_valid(chromosome: np.ndarray) -> bool:
     """
 
-    :param first_place: массив, который содержит все доступные значения для первой позиции в гене
-    :param second_place: массив, который содержит все доступные значения для второй позиции в гене
-    :return: случайно сгенерированный ген
+    :param chromosome: хромосома (или её шаблон)
+    :return: True/False для верной/нарушенной топологии хромосомы
+
+    Вершина со второй позиции гена не должна встречаться в последующих
+    генах. Для проверки вычисляется номер последнего гена, в котором
+    встречается каждая вершина, и сравнивается с номером гена, где эта
+    вершина стоит на второй позиции. Незаполненные гены шаблона (EMPTY)
+    пропускаются.
     """
-    node_1: int = random.choice(first_place.compressed(), size=1)[0]
-    node_2: int = random.choice(second_place.compressed(), size=1)[0]
-    return node_1, node_2
+    chromosome = np.asarray(chromosome)
+    filled: np.ndarray = chromosome[:, 1] != EMPTY
+    if not filled.any():
+        return True
+    nodes: np.ndarray = chromosome[filled]
+    last: np.ndarray = np.full(nodes.max() + 1, -1)
+    np.maximum.at(last, nodes.ravel(),
+                  np.repeat(np.flatnonzero(filled), 2))
+    return not (last[nodes[:, 1]] > np.flatnonzero(filled)).any()
 
 
-def create_individual(n: int, template: list = None) -> Individual:
+def create_individual(n: int, template: np.ndarray = None,
+                      index: TopologyIndex = None) -> np.ndarray:
     """
     :param n: Количество вершин бинарного дерева
     :param template: шаблон дочерней особи
-    :return: экземпляр класса Individual (особь)
+    :param index: индекс топологии шаблона (если не передан, строится по
+    шаблону)
+    :return: хромосома особи - массив формы (n - 1, 2)
 
     Хромосома имеет n - 1 генов, где n - число вершин бинарного дерева
     (или же для данной задачи это количество особей).
@@ -60,68 +160,98 @@ def create_individual(n: int, template: list = None) -> Individual:
         2. Занять вторую позицию в гене может только та вершина, которая
         никогда до этого также не была на второй позиции;
 
-        3. Вершины на первой и второй позиции в гене не могут быть одинаковыми.
-
-    Для соблюдения этих правил были созданы 2 массива:
-        1. first_place - это массив вершин, которые могут находиться на первой
-        позиции в каждом гене;
-
-        2. second_place - это массив вершин, которые могут находиться на второй
-        позиции в каждом гене;
+        3. Вершина на первой позиции в гене меньше вершины на второй позиции.
 
     Каждый ген образует собой вершину бинарного дерева. Эта вершина получает
     имя по минимальному элементу ветвей.
 
-    В цикле происходит формирование генов следующим образом:
-        1. На первую позицию в гене случайным образом из массива
-         first_place выбирается вершина (node_1);
+    Хромосома строится за один проход по генам, без повторных попыток.
+    Для этого поддерживаются 2 набора вершин:
+        1. alive - упорядоченный список вершин, которые ещё не были на второй
+        позиции. Из них выбирается вершина для первой позиции;
+
+        2. candidates - вершины, которые можно поставить на вторую позицию
+        текущего гена. Вершина становится кандидатом начиная с гена,
+        следующего за последним геном шаблона, где она стоит на первой
+        позиции (ready, по индексу топологии шаблона), ведь после второй
+        позиции вершина больше не встречается.
 
-        2. На вторую позицию в гене случайным образом из массива
-        second_place выбирается вершина (node_2);
+    В цикле незаполненный ген формируется следующим образом:
+        1. На вторую позицию случайным образом из candidates выбирается
+        вершина (node_2);
 
-        3. Если node_1 >= node_2, то пункты 1 и 2 повторяются снова;
+        2. На первую позицию случайным образом выбирается одна из вершин
+        alive, меньших node_2 (node_1). Такая вершина всегда есть, т.к.
+        вершина 0 никогда не бывает на второй позиции;
 
-        5. Ген добавляется в хромосому.
+        3. Вершина node_2 удаляется из alive.
 
+    Каждая вершина, кроме 0, ровно один раз стоит на второй позиции, поэтому
+    число незаполненных генов равно числу вершин, которые нужно разместить.
+    Кандидаты каждого следующего гена включают кандидатов предыдущего,
+    поэтому случайный выбор кандидата никогда не приводит в тупик: если
+    кандидатов не хватило, то шаблон достроить невозможно, и выбрасывается
+    исключение ImpossibleToCompleteError.
 
     Данная функция также используется для построения допустимых дочерних
     особей. Для этого нужно в аргумент функции передать необязательный
-    параметр template.
+    параметр template - массив формы (n - 1, 2), в котором незаполненные
+    гены отмечены значением EMPTY. Шаблон достраивается на месте, поэтому
+    в качестве шаблона можно передать строку массива Population.genes.
     """
-    first_place: m_arr = m_arr(arange(n))
-    second_place: m_arr = m_arr(arange(n))
-    cycle = 0
-    if template:
-        for i, gen in enumerate(template):
-            if gen:
-                second_place = masked_values(second_place, gen[1])
-    else:
-        template = [None] * (n - 1)
-    for i, gen in enumerate(template):
-        if gen is None:
-            correct = False
-            while not correct:
-                cycle += 1
-                node_1, node_2 = get_nodes(first_place, second_place)
-                while node_1 >= node_2:
-                    node_1, node_2 = get_nodes(first_place, second_place)
-                temp: list = template
-                temp[i] = (node_1, node_2)
-                correct = is_chromosome_valid(temp)
-                if cycle == 100:
-                    raise ImpossibleToCompleteError
-            first_place = masked_values(first_place, node_2)
-            second_place = masked_values(second_place, node_2)
-        else:
-            first_place = masked_values(first_place, gen[1])
-    return Individual(template)
-
-
-def create_population(individual_size: int, population_size: int) -> list:
+    if template is None:
+        template = np.full((n - 1, 2), EMPTY, dtype=np.int32)
+        index = TopologyIndex(n)
+    elif index is None:
+        index = TopologyIndex.from_template(template)
+    genes: list = template.tolist()
+    ready: list = [[] for _ in range(n)]
+    for node in range(1, n):
+        if index.second[node] == EMPTY:
+            ready[index.last[node] + 1].append(node)
+    alive: list = list(range(n))
+    candidates: list = []
+    randoms: np.ndarray = random.random_sample((n - 1, 2)).tolist()
+    for i, (node_1, node_2) in enumerate(genes):
+        candidates.extend(ready[i])
+        if node_2 == EMPTY:
+            if not candidates:
+                raise ImpossibleToCompleteError
+            k: int = int(randoms[i][0] * len(candidates))
+            node_2 = candidates[k]
+            candidates[k] = candidates[-1]
+            candidates.pop()
+            below: int = bisect_left(alive, node_2)
+            node_1 = alive[int(randoms[i][1] * below)]
+            template[i] = node_1, node_2
+        alive.pop(bisect_left(alive, node_2))
+    return template
+
+
+def create_population(individual_size: int, population_size: int,
+                      init: str = 'random',
+                      standard: np.ndarray = None) -> Population:
     """
 
     :param individual_size: количество вершин двоичного дерева
     :param population_size: размер популяции
-    :return: Возвращает сформированную популяцию (в списке)
+    :param init: способ создания: 'random' - случайные особи, 'heuristic' -
+    деревья UPGMA, WPGMA, присоединения соседей и их мутанты (см.
+    tools.clustering.warm_start_population)
+    :param standard: эталонная таблица (нужна только для 'heuristic')
+    :return: Возвращает сформированную популяцию
     """
-    return [create_individual(individual_size) for _ in range(population_size)]
+    if init == 'heuristic':
+        # Импорт внутри функции: tools.clustering сам использует этот модуль.
+        from tools.clustering import warm_start_population
+
+        return warm_start_population(
+            individual_size, population_size, standard)
+    if init != 'random':
+        raise ValueError(
+            f'Неизвестный способ создания популяции {init!r}, '
+            f"допустимые: 'random', 'heuristic'")
+    population = Population.empty(population_size, individual_size)
+    for chromosome in population.genes:
+        create_individual(individual_size, template=chromosome)
+    return population
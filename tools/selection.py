@@ -1,32 +1,44 @@
-import random
+import numpy as np
+from numpy import random
 
-from tools.population_creator import Individual
 
-
-def clone(to_clone: Individual) -> Individual:
+def select_best(fitness: np.ndarray, amount: int) -> np.ndarray:
     """
 
-    :param to_clone: особь, которую нужно склонировать
-    :return: новый экземпляр класса Individual
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :return: индексы amount лучших особей по возрастанию приспособленности
 
-    В каждом поколении должны быть новые экземпляры класса Individual во
-    избежании возможных проблем в последующих поколениях
+    Усечённый отбор за O(N): граничное значение приспособленности находится
+    с помощью np.argpartition, полная сортировка выполняется только для
+    отобранных особей. Из особей с одинаковой приспособленностью выбираются
+    стоящие раньше, поэтому результат совпадает с
+    np.argsort(fitness, kind='stable')[:amount].
     """
-    ind = Individual(to_clone[:])
-    ind.fitness.values = to_clone.fitness.values
-    return ind
-
-
-def select_tournament(population: list, p_len: int) -> list:
+    if amount >= len(fitness):
+        return np.argsort(fitness, kind='stable')
+    if amount <= 0:
+        return np.empty(0, dtype=np.intp)
+    boundary: int = np.argpartition(fitness, amount - 1)[amount - 1]
+    threshold: float = fitness[boundary]
+    better: np.ndarray = np.flatnonzero(fitness < threshold)
+    equal: np.ndarray = np.flatnonzero(fitness == threshold)
+    chosen: np.ndarray = np.concatenate(
+        [better, equal[:amount - len(better)]])
+    return chosen[np.lexsort((chosen, fitness[chosen]))]
+
+
+def select_tournament(fitness: np.ndarray, amount: int,
+                      tournament_size: int = 3) -> np.ndarray:
     """
 
-    :param population: массив популяции
-    :param p_len: размер популяции
-    :return: Возвращает отобранную популяцию
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :param tournament_size: количество особей в турнире
+    :return: индексы отобранных особей
 
     Функция проводит турнирный отбор.
 
-
     Алгоритм турнирного отбора позволяет сохранить разнообразие популяции,
     предоставляя шанс не самым приспособленным особям пройти отбор.
 
@@ -34,27 +46,122 @@ def select_tournament(population: list, p_len: int) -> list:
 
     Алгоритм турнирного отбора:
 
-        1. Выбираются три разные особи случайным образом;
+        1. Для всех турниров сразу одним вызовом генератора случайных чисел
+        выбираются по tournament_size особей (особи выбираются с
+        возвращением, что при большой популяции почти не отличается от
+        выбора разных особей);
+
+        2. В каждом турнире отбор проходит только та особь, которая имеет
+        минимальную функцию приспособленности.
+    """
+    contestants: np.ndarray = random.randint(
+        0, len(fitness), size=(amount, tournament_size))
+    winners: np.ndarray = fitness[contestants].argmin(axis=1)
+    return contestants[np.arange(amount), winners]
+
+
+def select_rank(fitness: np.ndarray, amount: int) -> np.ndarray:
+    """
+
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :return: индексы отобранных особей
+
+    Ранговый отбор: особи сортируются по приспособленности, и вероятность
+    отбора линейно убывает с номером особи (у лучшей из N особей вес N, у
+    худшей - 1).
+    """
+    size: int = len(fitness)
+    weights: np.ndarray = np.empty(size)
+    weights[np.argsort(fitness, kind='stable')] = np.arange(size, 0, -1)
+    return random.choice(size, size=amount, p=weights / weights.sum())
+
+
+def select_roulette(fitness: np.ndarray, amount: int) -> np.ndarray:
+    """
+
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :return: индексы отобранных особей
+
+    Отбор методом рулетки. Приспособленность минимизируется, поэтому вес
+    особи равен разности между худшей приспособленностью и её
+    приспособленностью. Если все особи одинаковы, отбор равновероятный.
+    """
+    weights: np.ndarray = fitness.max() - fitness
+    total: float = weights.sum()
+    if total <= 0:
+        return random.randint(0, len(fitness), size=amount)
+    return random.choice(len(fitness), size=amount, p=weights / total)
+
+
+SELECTIONS = {
+    'truncation': select_best,
+    'tournament': select_tournament,
+    'rank': select_rank,
+    'roulette': select_roulette,
+}
+
 
-        2. Из этих трёх особей проходит отбор только та, которая имеет
-        минимальную функцию приспособленности;
+def select(fitness: np.ndarray, amount: int, method: str = 'truncation',
+           elitism: int = 1) -> np.ndarray:
+    """
 
-        3. Отбор производится до тех пор, пока размер отобранной популяции
-        не будет равен размеру изначальной популяции.
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :param method: способ отбора (ключ SELECTIONS)
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :return: индексы отобранных особей по возрастанию приспособленности
 
+    Сначала отбираются elitism лучших особей, остальные места заполняются
+    выбранным способом отбора. При усечённом отборе лучшие особи и так
+    проходят отбор, поэтому elitism не учитывается.
+    """
+    if method not in SELECTIONS:
+        raise ValueError(
+            f'Неизвестный способ отбора {method!r}, '
+            f'допустимые: {", ".join(SELECTIONS)}')
+    if method == 'truncation':
+        return select_best(fitness, amount)
+    elitism = min(elitism, amount)
+    chosen: np.ndarray = np.concatenate([
+        select_best(fitness, elitism),
+        SELECTIONS[method](fitness, amount - elitism),
+    ])
+    return chosen[np.argsort(fitness[chosen], kind='stable')]
+
+
+def select_distinct(fitness: np.ndarray, amount: int,
+                    method: str = 'truncation',
+                    elitism: int = 1) -> np.ndarray:
+    """
 
+    :param fitness: значения функции приспособленности
+    :param amount: количество отбираемых особей
+    :param method: способ отбора (ключ SELECTIONS)
+    :param elitism: количество лучших особей, которые проходят отбор всегда
+    :return: индексы различных отобранных особей по возрастанию
+    приспособленности (не больше len(fitness))
+
+    Отбор без повторений: турнирный, ранговый отбор и рулетка выбирают
+    особи с возвращением, поэтому select повторяется для ещё не отобранных
+    особей, пока не наберётся amount особей. Каждый повтор добавляет хотя
+    бы одну особь; если осталось отобрать всех оставшихся, они
+    добавляются без розыгрыша.
     """
-    offspring: list = []
-    for i in range(p_len):
-        i1 = i2 = i3 = 0
-        while i1 == i2 or i1 == i3 or i2 == i3:
-            i1, i2, i3 = (random.randint(0, p_len - 1),
-                          random.randint(0, p_len - 1),
-                          random.randint(0, p_len - 1)
-                          )
-        offspring.append(
-            min(
-                [population[i1], population[i2], population[i3]],
-                key=lambda ind: ind.fitness.values)
-        )
-    return offspring
+    amount = min(amount, len(fitness))
+    chosen: np.ndarray = np.zeros(len(fitness), dtype=bool)
+    count: int = 0
+    while True:
+        remaining: np.ndarray = np.flatnonzero(~chosen)
+        picked: np.ndarray = select(fitness[remaining], amount - count,
+                                    method, elitism if count == 0 else 0)
+        chosen[remaining[picked]] = True
+        count = int(chosen.sum())
+        if count == amount:
+            break
+        if amount - count == len(remaining) - len(np.unique(picked)):
+            chosen[:] = True
+            break
+    result: np.ndarray = np.flatnonzero(chosen)
+    return result[np.argsort(fitness[result], kind='stable')]
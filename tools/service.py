@@ -0,0 +1,345 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from tools.batch import job_arguments, run_job
+from tools.newick import chromosome_to_tree, to_newick
+from tools.observer import Observer
+
+# Параметры задачи, не указанные клиентом.
+DEFAULTS = {
+    'population_size': 100,
+    'max_generations': 1000,
+    'progress_every': 10,
+}
+
+# Ключи задачи, которые использует сам сервис, а не tools.batch.run_job.
+SERVICE_KEYS = ('progress_every', 'names')
+
+
+class ProgressReporter(Observer):
+    """
+    Наблюдатель, который отправляет статистику каждого every-го поколения
+    в очередь событий сервиса.
+    """
+
+    def __init__(self, events, job_id: int, every: int):
+        self.events = events
+        self.job_id = job_id
+        self.every = every
+
+    def start(self, parameters: dict) -> None:
+        self.events.put({'event': 'started', 'job': self.job_id})
+
+    def generation(self, record: dict) -> None:
+        if record['generation'] % self.every == 0:
+            self.events.put({
+                'event': 'progress', 'job': self.job_id,
+                'generation': record['generation'],
+                'best': record['best'], 'mean': record['mean'],
+            })
+
+
+def warm_up() -> None:
+    """
+    Инициализатор процесса пула: выполняет короткий запуск алгоритма, чтобы
+    импорт модулей и первые вызовы numpy не замедляли первую задачу.
+    """
+    run_job({'matrix': np.eye(4) * 0.5 + 0.5, 'seed': 0,
+             'population_size': 4, 'max_generations': 1})
+
+
+def check_job(job: dict) -> None:
+    """
+
+    :param job: задача клиента с параметрами по умолчанию
+
+    Проверяет параметры задачи до отправки в пул (см.
+    tools.batch.job_arguments), чтобы ошибка в них приходила клиенту
+    событием error, а не исключением из процесса пула.
+    """
+    every = job['progress_every']
+    if isinstance(every, bool) or not isinstance(every, int) or every < 1:
+        raise ValueError(
+            f'progress_every должно быть целым числом не меньше 1, '
+            f'а не {every!r}')
+    job_arguments({name: value for name, value in job.items()
+                   if name not in SERVICE_KEYS})
+
+
+def run_service_job(job_id: int, job: dict, events) -> None:
+    """
+
+    :param job_id: номер задачи
+    :param job: задача (см. tools.batch.run_job)
+    :param events: очередь событий сервиса
+
+    Выполняется в процессе пула. Ход работы и результат (с деревом в
+    формате Newick) отправляются в очередь events, а не возвращаются,
+    поэтому клиент получает события задачи строго по порядку.
+    """
+    result: dict = run_job(
+        {name: value for name, value in job.items()
+         if name not in SERVICE_KEYS},
+        [ProgressReporter(events, job_id, job['progress_every'])])
+    result.pop('path')
+    if 'error' in result:
+        events.put({'event': 'error', 'job': job_id, **result})
+        return
+    root = chromosome_to_tree(np.array(result['chromosome']))
+    result['newick'] = to_newick(root, job.get('names'))
+    events.put({'event': 'result', 'job': job_id, **result})
+
+
+class Service:
+    """
+    Локальный сервис генетического алгоритма.
+
+    Сервис держит пул прогретых процессов (см. warm_up) и принимает
+    задачи по Unix-сокету или TCP на localhost. Протокол - строки JSON:
+    клиент отправляет по строке на задачу (таблица в ключе "matrix" или
+    путь к ней в "path" и параметры, как в tools.batch), а сервис
+    отвечает строками событий с номером задачи "job":
+        queued - задача поставлена в очередь;
+        started - задача начала выполняться в процессе пула;
+        progress - статистика поколения (каждые progress_every поколений);
+        result - хромосома, функция приспособленности, дерево Newick;
+        error - задача завершилась ошибкой (если ошибка в параметрах
+        задачи, событие queued не отправляется).
+
+    На строку, которая не является объектом JSON, сервис отвечает событием
+    error без номера задачи.
+
+    Задачи выполняются в порядке поступления, одновременно - не больше
+    числа процессов пула.
+    """
+
+    def __init__(self, workers: int = os.cpu_count()):
+        self.workers = workers
+        self.jobs = itertools.count()
+        self.listeners = {}
+        self.manager = None
+        self.events = None
+        self.executor = None
+        self.pump = None
+
+    async def start(self) -> None:
+        """
+        Запускает и прогревает процессы пула.
+
+        Процессы создаются методом spawn: при fork они унаследовали бы
+        открытые соединения клиентов, и закрытие соединения сервисом не
+        доходило бы до клиента.
+        """
+        context = get_context('spawn')
+        self.manager = context.Manager()
+        self.events = self.manager.Queue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=warm_up)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, os.getpid)
+            for _ in range(self.workers)))
+        self.pump = asyncio.create_task(self.dispatch())
+
+    async def dispatch(self) -> None:
+        """Передаёт события из процессов пула соединениям клиентов."""
+        loop = asyncio.get_running_loop()
+        while True:
+            event = await loop.run_in_executor(None, self.events.get)
+            if event is None:
+                return
+            listener = self.listeners.get(event['job'])
+            if listener is not None:
+                listener.put_nowait(event)
+
+    async def run(self, job: dict, writer: asyncio.StreamWriter) -> None:
+        """
+
+        :param job: задача клиента
+        :param writer: поток, в который пишутся события задачи
+        """
+        job_id: int = next(self.jobs)
+        job = {**DEFAULTS, 'seed': job_id, **job}
+        try:
+            check_job(job)
+        except Exception as error:
+            await send(writer, {'event': 'error', 'job': job_id,
+                                'error': f'{type(error).__name__}: {error}',
+                                'runtime': 0.0})
+            return
+        listener = asyncio.Queue()
+        self.listeners[job_id] = listener
+        await send(writer, {'event': 'queued', 'job': job_id})
+
+        def crashed(future: asyncio.Future) -> None:
+            # Процесс пула завершился аварийно и не отправил результат.
+            error = future.exception()
+            if error is not None:
+                listener.put_nowait({
+                    'event': 'error', 'job': job_id,
+                    'error': f'{type(error).__name__}: {error}',
+                    'runtime': time.perf_counter() - submitted,
+                })
+
+        submitted: float = time.perf_counter()
+        asyncio.get_running_loop().run_in_executor(
+            self.executor, run_service_job, job_id, job, self.events,
+        ).add_done_callback(crashed)
+        try:
+            while True:
+                event: dict = await listener.get()
+                await send(writer, event)
+                if event['event'] in ('result', 'error'):
+                    return
+        finally:
+            del self.listeners[job_id]
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Обслуживает одно соединение клиента."""
+        tasks: list = []
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                try:
+                    job: dict = json.loads(line)
+                except json.JSONDecodeError as error:
+                    await send(writer, {'event': 'error',
+                                        'error': f'JSONDecodeError: {error}'})
+                    continue
+                if not isinstance(job, dict):
+                    await send(writer, {
+                        'event': 'error',
+                        'error': f'Задача должна быть объектом JSON, '
+                                 f'а не {type(job).__name__}'})
+                    continue
+                tasks.append(asyncio.create_task(self.run(job, writer)))
+            await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def close(self) -> None:
+        self.events.put(None)
+        await self.pump
+        self.executor.shutdown()
+        self.manager.shutdown()
+
+
+async def send(writer: asyncio.StreamWriter, event: dict) -> None:
+    writer.write(json.dumps(event).encode() + b'\n')
+    await writer.drain()
+
+
+async def serve(socket_path: str = None, host: str = '127.0.0.1',
+                port: int = 8765, workers: int = os.cpu_count(),
+                ready: asyncio.Event = None) -> None:
+    """
+
+    :param socket_path: путь к Unix-сокету (если не задан, используется TCP)
+    :param host: адрес TCP
+    :param port: порт TCP
+    :param workers: количество процессов пула
+    :param ready: событие, которое устанавливается, когда сервис готов
+    принимать задачи
+
+    Запускает сервис и работает до отмены задачи.
+    """
+    service = Service(workers)
+    await service.start()
+    if socket_path is not None:
+        server = await asyncio.start_unix_server(service.handle, socket_path)
+    else:
+        server = await asyncio.start_server(service.handle, host, port)
+    try:
+        async with server:
+            if ready is not None:
+                ready.set()
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+async def submit(jobs: list, socket_path: str = None,
+                 host: str = '127.0.0.1', port: int = 8765):
+    """
+
+    :param jobs: задачи (таблица - список списков или массив numpy)
+    :param socket_path: путь к Unix-сокету сервиса (или None для TCP)
+    :param host: адрес TCP
+    :param port: порт TCP
+    :return: асинхронный генератор событий всех задач
+
+    Клиент сервиса: отправляет задачи и выдаёт события по мере их
+    поступления, пока не будут получены результаты всех задач.
+    """
+    if socket_path is not None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for job in jobs:
+            if isinstance(job.get('matrix'), np.ndarray):
+                job = {**job, 'matrix': job['matrix'].tolist()}
+            writer.write(json.dumps(job).encode() + b'\n')
+        await writer.drain()
+        writer.write_eof()
+        async for line in reader:
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+def run_remote(jobs: list, on_event=None, **address) -> list:
+    """
+
+    :param jobs: задачи
+    :param on_event: функция, вызываемая для каждого события (необязательно)
+    :param address: адрес сервиса (параметры submit)
+    :return: события result и error в порядке отправки задач
+
+    Синхронная обёртка над submit.
+    """
+    async def collect() -> list:
+        finished: list = []
+        async for event in submit(jobs, **address):
+            if on_event is not None:
+                on_event(event)
+            if event['event'] in ('result', 'error'):
+                finished.append(event)
+        return sorted(finished, key=lambda event: event.get('job', -1))
+
+    return asyncio.run(collect())
+
+
+def parse_args(argv: list = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description='Локальный сервис генетического алгоритма')
+    parser.add_argument('--socket', help='путь к Unix-сокету')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    return parser.parse_args(argv)
+
+
+def main(argv: list = None) -> int:
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args.socket, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
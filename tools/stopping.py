@@ -0,0 +1,67 @@
+import time
+
+# Причины остановки генетического алгоритма.
+MAX_GENERATIONS = 'max_generations'
+STALL = 'stall'
+TARGET_FITNESS = 'target_fitness'
+TIME_LIMIT = 'time_limit'
+MAX_EVALUATIONS = 'max_evaluations'
+
+
+class StoppingCriteria:
+    """
+    Критерии досрочной остановки генетического алгоритма.
+
+    Критерии можно сочетать, алгоритм останавливается по первому
+    сработавшему:
+        1. stall_generations - лучшая приспособленность не улучшилась хотя бы
+        на epsilon за последние stall_generations поколений;
+
+        2. target_fitness - лучшая приспособленность не больше заданной;
+
+        3. time_limit - с начала работы прошло больше time_limit секунд;
+
+        4. max_evaluations - вычислено не меньше max_evaluations значений
+        функции приспособленности (значения из кэша не считаются).
+
+    Критерий, равный None, не используется.
+    """
+
+    def __init__(self, stall_generations: int = None, epsilon: float = 0.0,
+                 target_fitness: float = None, time_limit: float = None,
+                 max_evaluations: int = None):
+        self.stall_generations = stall_generations
+        self.epsilon = epsilon
+        self.target_fitness = target_fitness
+        self.time_limit = time_limit
+        self.max_evaluations = max_evaluations
+        self.started = time.monotonic()
+
+    def start(self) -> None:
+        """Начинает отсчёт времени для критерия time_limit."""
+        self.started = time.monotonic()
+
+    def check(self, min_fitness_values: list, evaluations: int):
+        """
+
+        :param min_fitness_values: лучшая приспособленность по поколениям
+        :param evaluations: количество вычисленных значений приспособленности
+        :return: причина остановки или None, если алгоритм нужно продолжать
+        """
+        if (self.target_fitness is not None and min_fitness_values
+                and min_fitness_values[-1] <= self.target_fitness):
+            return TARGET_FITNESS
+        if (self.stall_generations is not None
+                and len(min_fitness_values) > self.stall_generations):
+            improvement: float = (
+                min_fitness_values[-self.stall_generations - 1]
+                - min_fitness_values[-1])
+            if improvement < self.epsilon or improvement <= 0:
+                return STALL
+        if (self.max_evaluations is not None
+                and evaluations >= self.max_evaluations):
+            return MAX_EVALUATIONS
+        if (self.time_limit is not None
+                and time.monotonic() - self.started >= self.time_limit):
+            return TIME_LIMIT
+        return None
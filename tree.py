@@ -1,27 +1,120 @@
 import matplotlib.pyplot as plt
 
 from tools.draw import draw_tree
-from tools.fitness import STANDARD
-from tools.main_algorithm import genetic_algorithm
+from tools.exact import solve
+from tools.islands import island_model
+from tools.loader import load_matrix
+from tools.newick import chromosome_to_tree, to_newick
+from tools.operator_rates import OperatorRates
+from tools.stopping import StoppingCriteria
 
 # Костанта задачи
-INDIVIDUAL_SIZE = len(STANDARD)  # Количетсво генов в хромосове особи
+DATA_PATH = 'data.xlsx'  # Эталонная таблица (.xlsx, .npy, .csv, .phy)
 
 # Константы генетического алгоритма
 POPULATION_SIZE = 100  # Количество особей в популяции
 MAX_GENERATIONS = 5000  # Максимальное число поколений
+WORKERS = 1  # Количество процессов для вычисления приспособленности
+# Количество процессов точного метода (для таблиц до tools.exact.EXACT_SIZE
+# особей)
+EXACT_PROCESSES = 1
+# Способ отбора: 'truncation', 'tournament', 'rank' или 'roulette'
+SELECTION = 'truncation'
+# Остановка, если лучшая приспособленность не улучшалась столько поколений
+# (None - не останавливать досрочно)
+STALL_GENERATIONS = None
+TIME_LIMIT = None  # Ограничение времени работы в секундах
+# Количество лучших особей, улучшаемых локальным поиском в каждом поколении
+# (0 - без локального поиска)
+MEMETIC = 0
+# Функция приспособленности: 'auto' (numba, если установлен), 'batch' или
+# 'streamed' (для больших таблиц)
+EVALUATION = 'auto'
+# Начальная популяция: 'random' или 'heuristic' (UPGMA, WPGMA, NJ и мутанты)
+INIT = 'random'
+# Радиус ниши для разделения приспособленности по расстоянию между деревьями
+# (0 - без разделения, копии одного дерева отбрасываются всегда)
+SHARING = 0.0
+# Стационарный режим: доля популяции, заменяемая потомками за шаг
+# (0 - поколенческий режим)
+STEADY_STATE = 0.0
+CROSSOVER_RATE = 1.0  # Вероятность скрещивания
+MUTATION_RATE = 1.0  # Вероятность мутации
+# Подстраивать вероятности под успешность операторов
+ADAPTIVE_RATES = False
 
-best_individual, min_values, mean_values = genetic_algorithm(
-    speciman_size=INDIVIDUAL_SIZE,
-    population_size=POPULATION_SIZE,
-    max_generations=MAX_GENERATIONS,
-)
+# Константы островной модели (при ISLANDS = 1 острова не используются).
+# На островах действуют SELECTION, MEMETIC, INIT, SHARING и вероятности
+# операторов; STEADY_STATE, STALL_GENERATIONS, TIME_LIMIT, EVALUATION и
+# WORKERS при ISLANDS > 1 не применяются - каждый остров выполняет все
+# MAX_GENERATIONS поколений в своём процессе.
+ISLANDS = 1  # Количество островов (процессов)
+MIGRATION_INTERVAL = 50  # Количество поколений между обменами особями
+MIGRANTS_AMOUNT = 5  # Количество особей, которыми обмениваются острова
+TOPOLOGY = 'ring'  # Топология обмена: 'ring' или 'complete'
 
-draw_tree(best_individual)
-plt.plot(min_values, color='red')
-plt.plot(mean_values, color='blue')
-plt.xlabel('Поколение')
-plt.ylabel('Мин/средняя приспособленность')
-plt.title(
-    'Зависимость минимальной и средней приспособленности от поколения')
-plt.show()
+if __name__ == '__main__':
+    standard = load_matrix(DATA_PATH)
+    if ISLANDS > 1:
+        best_individual, statistics = island_model(
+            speciman_size=len(standard),
+            population_size=POPULATION_SIZE,
+            max_generations=MAX_GENERATIONS,
+            islands=ISLANDS,
+            migration_interval=MIGRATION_INTERVAL,
+            migrants_amount=MIGRANTS_AMOUNT,
+            topology=TOPOLOGY,
+            standard=standard,
+            selection=SELECTION,
+            memetic=MEMETIC,
+            init=INIT,
+            sharing=SHARING,
+            rates=OperatorRates(CROSSOVER_RATE, MUTATION_RATE,
+                                adaptive=ADAPTIVE_RATES),
+        )
+    else:
+        # Небольшие таблицы (до tools.exact.EXACT_SIZE особей) solve решает
+        # точно методом ветвей и границ, остальные - генетическим
+        # алгоритмом.
+        best_individual, fitness, optimal, details = solve(
+            standard=standard,
+            population_size=POPULATION_SIZE,
+            max_generations=MAX_GENERATIONS,
+            time_limit=TIME_LIMIT,
+            processes=EXACT_PROCESSES,
+            workers=WORKERS,
+            selection=SELECTION,
+            memetic=MEMETIC,
+            evaluation=EVALUATION,
+            init=INIT,
+            sharing=SHARING,
+            steady_state=STEADY_STATE,
+            rates=OperatorRates(CROSSOVER_RATE, MUTATION_RATE,
+                                adaptive=ADAPTIVE_RATES),
+            stopping=StoppingCriteria(
+                stall_generations=STALL_GENERATIONS,
+                time_limit=TIME_LIMIT,
+            ),
+        )
+        if details['method'] == 'exact':
+            print(f'Приспособленность: {fitness}, '
+                  f'{"оптимум" if optimal else "прервано по времени"}')
+            statistics = []
+        else:
+            print(f'Остановка: {details["stop_reason"]}, '
+                  f'поколений: {len(details["min_fitness_values"])}')
+            statistics = [(details['min_fitness_values'],
+                           details['mean_fitness_values'])]
+
+    draw_tree(best_individual)
+    print(to_newick(
+        chromosome_to_tree(best_individual, standard, heights=True),
+        lengths=True))
+    for min_values, mean_values in statistics:
+        plt.plot(min_values, color='red')
+        plt.plot(mean_values, color='blue')
+    plt.xlabel('Поколение')
+    plt.ylabel('Мин/средняя приспособленность')
+    plt.title(
+        'Зависимость минимальной и средней приспособленности от поколения')
+    plt.show()